@@ -0,0 +1,95 @@
+import os
+import threading
+from typing import Dict
+
+import pygame
+import pygame.mixer
+
+
+EFFECTS, MUSIC = 0, 1  # Канал для коротких звуков и канал для фоновой музыки (сирены)
+
+
+class SoundBank:
+    '''Все звуки из папки sounds, загруженные в память один раз.
+    Звук выдаётся по имени файла без расширения: sound_bank.get('wakka').'''
+    def __init__(self, directory='sounds'):
+        self.directory = directory
+        self.sounds: Dict[str, pygame.mixer.Sound] = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.loaded = False  # Все звуки из папки уже загружены
+
+    def preload(self, background=False):
+        if background:
+            self.thread = threading.Thread(target=self.load_all, daemon=True)
+            self.thread.start()
+        else:
+            self.load_all()
+
+    def load_all(self):
+        for file_name in sorted(os.listdir(self.directory)):
+            name, extension = os.path.splitext(file_name)
+            if extension == '.wav':
+                self.get(name)
+        self.loaded = True
+
+    def get(self, name: str) -> pygame.mixer.Sound:
+        with self.lock:
+            sound = self.sounds.get(name)
+            if sound is None:
+                # Звук, который ещё не успел загрузиться в фоне, загружается сразу.
+                sound = pygame.mixer.Sound(os.path.join(self.directory, name + '.wav'))
+                self.sounds[name] = sound
+        return sound
+
+    def channel(self, channel: int) -> pygame.mixer.Channel:
+        return pygame.mixer.Channel(channel)
+
+    def play(self, name: str, channel: int = EFFECTS, loops: int = 0):
+        self.channel(channel).play(self.get(name), loops)
+
+    def set_volume(self, channel: int, volume: float):
+        self.channel(channel).set_volume(volume)
+
+    def stop(self, channel: int):
+        self.channel(channel).stop()
+
+
+sound_bank = SoundBank()
+
+
+class MusicController:
+    '''Фоновая мелодия на канале MUSIC: siren_1..5, active_energy или hiding.
+    Мелодия меняется только тогда, когда состояние игры требует другую.'''
+    def __init__(self, bank: SoundBank):
+        self.bank = bank
+        self.track = None
+
+    @staticmethod
+    def choose(siren_level: int, disarming: bool, running: bool) -> str:
+        if running:
+            return 'hiding'
+        if disarming:
+            return 'active_energy'
+        return 'siren_{}'.format(min(max(siren_level, 1), 5))
+
+    def update(self, siren_level: int, disarming: bool, running: bool):
+        track = self.choose(siren_level, disarming, running)
+        if track != self.track:
+            self.play(track)
+
+    def play(self, track: str):
+        self.bank.play(track, MUSIC, -1)
+        self.track = track
+
+    def interrupt(self, name: str, loops: int = 0):
+        # Разовый звук на канале музыки: после него фоновая мелодия запустится заново.
+        self.bank.play(name, MUSIC, loops)
+        self.track = None
+
+    def stop(self):
+        self.bank.stop(MUSIC)
+        self.track = None
+
+
+music = MusicController(sound_bank)
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from bots import bots
+from engine import GameState, TotalPoints, fps
+
+
+def play_level(level: int, seed: int, bot: str, max_ticks: int) -> Dict[str, object]:
+    '''Одна игра без окна на одном уровне: три жизни, до прохождения уровня или до конца жизней.'''
+    state = GameState(level, TotalPoints(high_score='0'), seed=seed)
+    policy = bots[bot](seed)
+    deaths = Counter()
+    cleared, over = False, False
+
+    while state.ticks < max_ticks and not cleared and not over:
+        for name, data in state.step(policy(state)):
+            if name == 'death':
+                deaths[data.name] += 1
+                over = not state.lose_life()
+            elif name == 'clear':
+                cleared = True
+
+    return {'level': level, 'seed': seed, 'ticks': state.ticks, 'cleared': cleared,
+            'eaten': state.food_total - state.food_left, 'points': state.totalpoints.points, 'deaths': dict(deaths)}
+
+
+def play_chunk(level: int, seeds: List[int], bot: str, max_ticks: int) -> List[Dict[str, object]]:
+    # Каждый процесс импортирует mapfile заново, поэтому у него своя карта с таблицей маршрутов (из кеша на диске).
+    results = []
+    for seed in seeds:
+        try:
+            results.append(play_level(level, seed, bot, max_ticks))
+        except Exception as error:
+            # Ошибка в логике призраков не должна останавливать весь пакет: игру можно повторить по зерну.
+            results.append({'level': level, 'seed': seed, 'error': repr(error)})
+    return results
+
+
+def summarize(results: List[Dict[str, object]]) -> Dict[int, Dict[str, object]]:
+    report = {}
+    for level in sorted({result['level'] for result in results}):
+        errors = [result for result in results if result['level'] == level and 'error' in result]
+        games = [result for result in results if result['level'] == level and 'error' not in result] or [{
+            'ticks': 0, 'cleared': False, 'eaten': 0, 'points': 0, 'deaths': {}}]
+        deaths = Counter()
+        for game in games:
+            deaths.update(game['deaths'])
+        report[level] = {
+            'games': len(games) if games[0]['ticks'] else 0,
+            'errors': [error['seed'] for error in errors],
+            'cleared': sum(game['cleared'] for game in games) / len(games),
+            'survival_seconds': sum(game['ticks'] for game in games) / len(games) / fps,
+            'eaten': sum(game['eaten'] for game in games) / len(games),
+            'points': sum(game['points'] for game in games) / len(games),
+            'deaths': {name: deaths[name] / len(games) for name in ('blinky', 'pinky', 'inky', 'clyde')},
+        }
+    return report
+
+
+def print_report(report: Dict[int, Dict[str, object]]):
+    print('{:>7} {:>6} {:>8} {:>8} {:>6} {:>7}  {:>6} {:>6} {:>6} {:>6} {:>7}'.format(
+        'уровень', 'игр', 'пройден', 'время,с', 'еда', 'очки', 'blinky', 'pinky', 'inky', 'clyde', 'ошибок'))
+    for level, row in report.items():
+        print('{:>7} {:>6} {:>7.0%} {:>8.1f} {:>6.1f} {:>7.0f}  {:>6.2f} {:>6.2f} {:>6.2f} {:>6.2f} {:>7}'.format(
+            level, row['games'], row['cleared'], row['survival_seconds'], row['eaten'], row['points'],
+            *row['deaths'].values(), len(row['errors'])))
+    errors = {level: row['errors'] for level, row in report.items() if row['errors']}
+    if errors:
+        print('Игры с ошибками (уровень: зёрна):', errors)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Пакет игр без окна на всех ядрах: выживаемость по уровням')
+    parser.add_argument('-n', '--games', type=int, default=100, help='игр на каждый уровень')
+    parser.add_argument('--levels', default='1-16', help='уровни: 5, 1-16 или 1,4,10')
+    parser.add_argument('--bot', choices=sorted(bots), default='greedy')
+    parser.add_argument('--seed', type=int, default=0, help='зерно первой игры, у остальных зёрна идут подряд')
+    parser.add_argument('--minutes', type=float, default=5, help='предел длины одной игры в минутах игрового времени')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='число процессов')
+    parser.add_argument('--chunk', type=int, default=25, help='игр в одном задании процесса')
+    parser.add_argument('--json', metavar='FILE', help='записать отчёт и результаты всех игр в JSON')
+    args = parser.parse_args()
+
+    levels = []
+    for part in args.levels.split(','):
+        first, _, last = part.partition('-')
+        levels.extend(range(int(first), int(last or first) + 1))
+    max_ticks = int(args.minutes * 60 * fps)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = []
+        for level in levels:
+            seeds = list(range(args.seed, args.seed + args.games))
+            for i in range(0, len(seeds), args.chunk):
+                futures.append(executor.submit(play_chunk, level, seeds[i:i + args.chunk], args.bot, max_ticks))
+        results = [result for future in futures for result in future.result()]
+
+    report = summarize(results)
+    print_report(report)
+    print('{} игр за {:.1f} с, процессов: {}'.format(len(results), time.perf_counter() - start, args.workers))
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'report': report, 'games': results}, file, indent=4)
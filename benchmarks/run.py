@@ -0,0 +1,229 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+os.chdir(root)  # Игра загружает data/, sounds/ и scores.txt по относительным путям
+
+import pygame
+import pygame.display, pygame.time, pygame.mixer
+
+from mapfile import game_map, graph, nodes_matrix
+from build_functions import find_path, get_adjacent_nodes
+from engine import GameState, TotalPoints
+from global_values import cell_size
+
+
+baseline_path = os.path.join(root, 'benchmarks', 'baseline.json')
+cases: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def case(name):
+    '''Регистрирует замер. Функция готовит данные и возвращает то, что будет вызываться в цикле замера.'''
+    def register(setup):
+        cases[name] = setup
+        return setup
+    return register
+
+
+@case('find_path')
+def find_path_case():
+    # Пути между соседними по списку развилками: 34 пары, в том числе через весь лабиринт.
+    junctions = sorted(game_map.junctions)
+    pairs = [(nodes_matrix[a[1]][a[0]], nodes_matrix[b[1]][b[0]])
+             for a, b in zip(junctions, junctions[1:] + junctions[:1])]
+
+    def run():
+        for start, goal in pairs:
+            find_path(start, goal)
+    return run
+
+
+@case('plan')
+def plan_case():
+    # Те же пары, что и в find_path, но по графу коридоров. План читается до конца, как и путь find_path.
+    junctions = sorted(game_map.junctions)
+    pairs = [(nodes_matrix[a[1]][a[0]], nodes_matrix[b[1]][b[0]])
+             for a, b in zip(junctions, junctions[1:] + junctions[:1])]
+
+    def run():
+        for start, goal in pairs:
+            for _ in graph.plan(start, goal):
+                pass
+    return run
+
+
+@case('get_adjacent_nodes')
+def adjacent_case():
+    cells = [cell for line in nodes_matrix for cell in line if cell.type == 'field']
+
+    def run():
+        for cell in cells:
+            get_adjacent_nodes(cell)
+    return run
+
+
+def ghost_case(index, mode):
+    def setup():
+        state = GameState(seed=0, totalpoints=TotalPoints(high_score='0'))
+        state.pacman_field.update(14, 23)
+        ghost = state.ghosts[index]
+        # Призрак ставится на перекрёсток (6, 5) уже вышедшим из дома.
+        ghost.x, ghost.y = 6 * cell_size - 11, (5 + 3) * cell_size - 11
+        ghost.in_the_game, ghost.path, ghost.counter = True, None, 0
+        ghost.scatter = mode == 'scatter'
+        if mode == 'frightened':
+            ghost.disarming = state.disarming = True
+            ghost.update_time()
+        start = dict(ghost.__dict__)
+
+        def run():
+            # Каждая серия начинается с одного и того же положения, иначе призрак уходит в другие части лабиринта.
+            ghost.__dict__.update(start)
+            state.random.seed(0)
+            for _ in range(60):
+                ghost.move()
+        return run
+    return setup
+
+
+for ghost_index, ghost_name in enumerate(('blinky', 'pinky', 'inky', 'clyde')):
+    for ghost_mode in ('chase', 'scatter', 'frightened'):
+        case('{}.move[{}]'.format(ghost_name, ghost_mode))(ghost_case(ghost_index, ghost_mode))
+
+
+def prepare_game():
+    import game
+    game.init_display()
+    pygame.mixer.init()
+    game.totalpoints, game.play_sound = TotalPoints(high_score='0'), False
+    return game
+
+
+@case('render_counters')
+def counters_case():
+    game = prepare_game()
+    return game.render_counters
+
+
+class FrameLimit(Exception):
+    pass
+
+
+@case('playing frame')
+def frame_case():
+    # Один кадр PlayingScene целиком: тики симуляции и отрисовка. Заставка уровня не проигрывается,
+    # состояние готовится так же, как в IntroScene, часы всегда отдают ровно один тик на кадр,
+    # а цикл прерывается после нужного числа кадров игры.
+    game = prepare_game()
+    frames, limit = [0], 120
+
+    class TickClock:
+        def tick(self, *args):
+            return 1000 / 60
+
+    def counted_frame(elapsed):
+        if frames[0] >= limit:
+            raise FrameLimit
+        frames[0] += 1
+        return type(game.playing).frame(game.playing, elapsed)
+
+    def run():
+        clock = pygame.time.Clock
+        pygame.time.Clock, game.playing.frame = TickClock, counted_frame
+        frames[0] = 0
+        game.state = None
+        intro = game.IntroScene(1)
+        intro.enter()
+        try:
+            game.run(intro.finish())
+        except FrameLimit:
+            pass
+        finally:
+            pygame.time.Clock = clock
+            del game.playing.frame
+    return run, limit
+
+
+def measure(setup, repeat: int, budget: float) -> float:
+    '''Лучшее время одного вызова из repeat серий, каждая серия длится около budget секунд.'''
+    prepared = setup()
+    run, per_call = prepared if isinstance(prepared, tuple) else (prepared, 1)
+    start = time.perf_counter()
+    run()
+    once = max(time.perf_counter() - start, 1e-6)
+    number = max(1, int(budget / once))
+
+    best = float('inf')
+    gc.disable()  # Как в timeit: сборка мусора посреди серии искажает время
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                run()
+            best = min(best, (time.perf_counter() - start) / number)
+    finally:
+        gc.enable()
+    return best / per_call
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], threshold: float) -> List[Tuple[str, float]]:
+    slower = []
+    for name, seconds in results.items():
+        if name in baseline and seconds > baseline[name] * (1 + threshold):
+            slower.append((name, seconds / baseline[name]))
+    return slower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Замеры скорости поиска путей, призраков и отрисовки')
+    parser.add_argument('-k', dest='pattern', default='',
+                        help='запускать только замеры, в названии которых есть строка')
+    parser.add_argument('--save', action='store_true', help='записать результаты как новую базу в baseline.json')
+    parser.add_argument('--baseline', default=baseline_path, help='файл базы для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='допустимое замедление относительно базы (0.25 — на 25%%)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=0.2, help='длительность одной серии в секундах')
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    elif not args.save:
+        # Без базы сравнивать не с чем, и проверка не должна молча проходить.
+        print('Нет базы {}: сначала запустите с --save'.format(args.baseline), file=sys.stderr)
+        sys.exit(2)
+
+    results = {}
+    for name, setup in cases.items():
+        if args.pattern not in name:
+            continue
+        results[name] = measure(setup, args.repeat, args.budget)
+        line = '{:<28} {:>12.1f} мкс'.format(name, results[name] * 1e6)
+        if name in baseline:
+            line += '  {:>6.2f}x базы'.format(results[name] / baseline[name])
+        elif not args.save:
+            line += '  нет в базе, не сравнивается'
+        print(line)
+
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            # Замеры, которых больше нет (удалены или переименованы), из базы убираются.
+            kept = {name: seconds for name, seconds in baseline.items() if name in cases}
+            json.dump({**kept, **results}, file, indent=4, sort_keys=True)
+        print('База записана в', args.baseline)
+    else:
+        slower = compare(results, baseline, args.threshold)
+        for name, ratio in slower:
+            print('ЗАМЕДЛЕНИЕ: {} в {:.2f} раза медленнее базы'.format(name, ratio))
+        if slower:
+            sys.exit(1)
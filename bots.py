@@ -0,0 +1,71 @@
+import random
+from collections import deque
+from typing import Optional, Tuple
+
+from engine import GameState
+from mapfile import routes
+from global_values import cell_size, directions
+
+
+class RandomBot:
+    '''Поворачивает в случайную сторону раз в period тиков.'''
+    def __init__(self, seed=None, period=40):
+        self.random = random.Random(seed)
+        self.period = period
+
+    def __call__(self, state: GameState) -> Optional[Tuple[int, int]]:
+        return self.random.choice(directions) if state.global_frame % self.period == 0 else None
+
+
+class GreedyBot:
+    '''Идёт к ближайшей еде по кратчайшему пути, обходя клетки рядом с опасными призраками.
+    Решение принимается только на границе клеток, когда Пакман может повернуть.'''
+    danger = 2  # На сколько клеток держаться от призрака, который не напуган
+
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+
+    def __call__(self, state: GameState) -> Optional[Tuple[int, int]]:
+        pacman = state.pacman
+        if pacman.counter:
+            return None
+
+        start = routes.index.get((pacman.path[1], pacman.path[0]))
+        if start is None:
+            return None
+
+        blocked = set()
+        for ghost in state.ghosts:
+            if ghost.in_the_game and not ghost.disarming:
+                cell = routes.index.get((int((ghost.x + 12) // cell_size),
+                                         int((ghost.y + 12 - 3 * cell_size) // cell_size)))
+                if cell is not None:
+                    blocked.update(self.around(cell))
+
+        # Обход в ширину от Пакмана: первая клетка с едой, до которой можно дойти, минуя опасные клетки.
+        first = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            x, y = routes.cells[node]
+            if node != start and state.maze.food[y * state.maze.stride + x]:
+                return first[node]
+            for adjacent, d in routes.neighbours[node]:
+                if adjacent not in first and adjacent not in blocked:
+                    first[adjacent] = first[node] or directions[d]
+                    queue.append(adjacent)
+
+        # Еды не видно или путь перекрыт: уходим в любую свободную сторону.
+        free = [directions[d] for adjacent, d in routes.neighbours[start] if adjacent not in blocked]
+        return self.random.choice(free) if free else None
+
+    def around(self, node):
+        near, frontier = {node}, [node]
+        for _ in range(self.danger):
+            frontier = [adjacent for current in frontier for adjacent, _ in routes.neighbours[current]
+                        if adjacent not in near]
+            near.update(frontier)
+        return near
+
+
+bots = {'random': RandomBot, 'greedy': GreedyBot}
@@ -0,0 +1,746 @@
+import math
+import random
+from typing import List, Optional, Tuple
+
+from maps import Maze, FIELD, WALL, ENERGIZER
+from mapfile import game_map, graph, maze, nodes_matrix, routes
+from routing import DistanceField
+from profiler import profiler
+from global_values import cell_size, fruits_order
+
+
+fps = 60  # Кадров (тиков) симуляции в секунду
+# Строка туннеля и его последние клетки слева и справа. На карте без туннеля ни одна клетка в него не попадает.
+tunnel_row, tunnel_left, tunnel_right = game_map.tunnel or (-1, -1, maze.width)
+
+# Столкновение Пакмана с призраком, снятое с масок спрайтов pacman/full.png и ghosts/blinky/right1.png:
+# (dy от, dy до, dx от, dx до), где dx, dy — смещение призрака относительно Пакмана в пикселях.
+hit_bands = ((-41, -39, -29, 26), (-38, -36, -35, 32), (-35, -30, -38, 35), (-29, 8, -41, 38),
+             (9, 17, -38, 35), (18, 23, -35, 32), (24, 26, -32, 29), (27, 29, -29, 26),
+             (30, 32, -26, 23), (33, 35, -20, 17), (36, 38, -14, 11))
+
+
+def read_high_score() -> str:
+    with open('scores.txt', 'r') as file:
+        string = file.readline()
+        if string:
+            scores = list(map(int, string.split(', ')))
+        else:
+            scores = [0]
+    scores = sorted(scores)[::-1]
+    return str(scores[0]) if scores[0] < 999999 else '999999'
+
+
+def collide(pacman, ghost) -> bool:
+    dx = math.floor(ghost.x + 0.5) - math.floor(pacman.x + 0.5)
+    dy = math.floor(ghost.y + 0.5) - math.floor(pacman.y + 0.5)
+    for dy_min, dy_max, dx_min, dx_max in hit_bands:
+        if dy_min <= dy <= dy_max:
+            return dx_min <= dx <= dx_max
+    return False
+
+
+class Pac_man:
+    def __init__(self, game, x, y, direction):
+        self.game = game
+        self.x, self.y = x, y
+        self.frame = 0
+
+        self.direction = direction
+        self.player_direction = (0, 0)
+        self.counter = 0
+
+        self.path = [int((self.y + 11) // cell_size - 3), int((self.x + 11) // cell_size)]
+
+    def move(self):
+        if self.counter == 0:
+            if self.wall_check(self.player_direction):
+                self.direction = self.player_direction
+            if self.direction != (0, 0) and self.wall_check(self.direction):
+                self.counter = 24
+
+        if self.wall_check(self.direction) and self.direction != (0, 0):
+            if self.direction == (-1, 0) or self.direction == (0, -1):
+                self.path = [int((self.y + 33) // cell_size - 3), int((self.x + 33) // cell_size)]
+            else:
+                self.path = [int((self.y + 12) // cell_size - 3), int((self.x + 12) // cell_size)]
+
+            self.x += self.direction[0]
+            if not (self.path[0] == tunnel_row and (self.path[1] <= tunnel_left or self.path[1] >= tunnel_right)):
+                self.y += self.direction[1]
+
+            if self.x <= 0:
+                self.x = 672
+            elif self.x >= 672:
+                self.x = 0
+
+            self.counter -= 1
+
+    def wall_check(self, direction):
+        # За краем лабиринта (в туннеле) стены нет.
+        row, column = self.path[0] + direction[1], self.path[1] + direction[0]
+        if 0 <= row < maze.height and 0 <= column < maze.stride:
+            return maze.kinds[row * maze.stride + column] != WALL
+        return maze.kind(column, row) != WALL
+
+    def frames(self):
+        if self.wall_check(self.direction):
+            if self.game.global_frame % 4 == 0:
+                self.frame += 1
+
+
+class Ghost:
+    name = 'blinky'
+
+    def __init__(self, game, x, y):
+        self.game = game
+        self.x, self.y = x, y
+        self.look = (self.name, 'normal', 'right')  # Ключ спрайта: (персонаж, настроение, направление)
+
+        self.counter = 0
+        self.path = None
+
+        self.last_seconds = 0
+
+        self.angry = False
+        self.scatter = True
+        self.run = False
+        self.in_the_game = False
+        self.disarming = False
+
+    def update_time(self):
+        self.last_seconds = self.game.seconds
+
+    def pave(self, end=None):
+        pacman = self.game.pacman
+        coord_y = int((self.y + 12 - 3 * cell_size) // cell_size)
+        coord_x = int((self.x + 12) // cell_size)
+        try:
+            if self.counter == 0:
+                if not self.scatter and (
+                        not self.path or ((coord_x, coord_y) in game_map.junctions and not self.disarming)
+                ):
+                    if (int((end[1] + 11 - 3 * cell_size) // cell_size) < 0 or
+                            int((end[0] + 11) // cell_size) < 0):
+                        raise IndexError
+                    start = nodes_matrix[coord_y][coord_x]
+                    goal = nodes_matrix[int((end[1] + 11 - 3 * cell_size) // cell_size)] \
+                        [int((end[0] + 11) // cell_size)]
+                    # План отдаёт шаги по коридорам. Обычно до следующей развилки, где путь выбирается заново.
+                    with profiler.scope('find_path'):
+                        plan = graph.plan(start, goal)
+                    if plan:
+                        self.path = plan
+                self.direction = next(self.path)
+                in_the_passage = (coord_y == tunnel_row and (coord_x <= tunnel_left or coord_x >= tunnel_right))
+                self.counter = (8 if self.angry else 12) if not self.disarming and not in_the_passage else 16
+                self.speed = (3 if self.angry else 2) if not self.disarming and not in_the_passage else 1.5
+
+                if self.run:
+                    self.counter, self.speed = 3, 8
+                    with profiler.scope('find_path'):
+                        self.path = iter(routes.path(nodes_matrix[coord_y][coord_x], nodes_matrix[14][13]))
+                    self.direction = next(self.path)
+            self.x = round(self.x + self.direction[0] * self.speed, 1)
+            self.y = round(self.y + self.direction[1] * self.speed, 1)
+            self.counter -= 1
+        except StopIteration:
+            self.path = None
+            if self.run and (coord_x, coord_y) == (13, 14):
+                self.run, self.disarming = False, False
+        except TypeError:
+            self.path = None
+        except IndexError:
+            if isinstance(self, Pinky):
+                self.pave((pacman.x, pacman.y))
+            elif isinstance(self, Inky):
+                path_x, path_y = pacman.x - 2 * cell_size, pacman.y - 2 * cell_size
+                if int((path_x + 11) // cell_size) > 0 and int((path_y + 11 - 3 * cell_size) // cell_size) > 0:
+                    self.pave((path_x, path_y))
+                else:
+                    self.pave((pacman.x, pacman.y))
+
+        if self.run:
+            if self.direction in [(0.5, 0), (1, 0)]:
+                side = 'right'
+            elif self.direction in [(-0.5, 0), (-1, 0)]:
+                side = 'left'
+            elif self.direction == (0, 1):
+                side = 'down'
+            elif self.direction == (0, -1):
+                side = 'up'
+            self.look = ('killing', 'died', side)
+        elif self.disarming:
+            if self.last_seconds == 0:
+                self.update_time()
+
+            up_time = 10 - self.game.level // 2
+            time_shift = round(up_time - (self.game.seconds - self.last_seconds), 2)
+            if time_shift == 0:
+                self.game.disarming = False
+                self.disarming = False
+                self.last_seconds = 0
+            elif time_shift in [3.3, 2.65, 1.98, 1.32, 0.65]:
+                self.look = ('killing', 'end-disarmed', None)
+            elif time_shift in [2.97, 2.32, 1.65, 0.98, 0.33] or up_time - 0.05 <= time_shift <= up_time:
+                self.look = ('killing', 'disarmed', None)
+
+
+class Blinky(Ghost):
+    name = 'blinky'
+
+    def __init__(self, game, x, y):
+        super().__init__(game, x, y)
+        self.start_dispersion((14, 11))
+        self.scatter = True
+
+    def start_dispersion(self, end):
+        self.path = iter(routes.path(nodes_matrix[end[1]][end[0]], nodes_matrix[1][25]) + [(1, 0)])
+
+    def move(self, type_of_move='normal'):
+        pacman, pacman_field = self.game.pacman, self.game.pacman_field
+        if type_of_move == 'agressive':
+            self.angry = True
+        elif type_of_move == 'normal':
+            self.angry = False
+
+        coord_x = int((self.x + 11) // cell_size)
+        coord_y = int((self.y + 11 - 3 * cell_size) // cell_size)
+
+        if self.disarming and not self.path:
+            diff_x, diff_y = pacman.x - self.x, pacman.y - self.y
+            if 1 <= diff_x <= 48 and 1 <= diff_y <= 48:
+                super().pave((self.x - diff_x, self.y - diff_y))
+            else:
+                direct = pacman_field.toward(coord_x, coord_y)
+                good_directions = {(-1, 0), (1, 0), (0, 1), (0, -1)} - {direct}
+                free_directions = []
+                for dir_ in good_directions:
+                    if maze.kind(coord_x + dir_[0], coord_y + dir_[1]) == FIELD:
+                        free_directions.append(dir_)
+                if direct:
+                    self.path = iter([self.game.random.choice(free_directions) if free_directions else direct])
+                else:
+                    self.path = iter([self.direction] * 7)
+                super().pave()
+        elif (coord_x, coord_y) == (tunnel_left, tunnel_row) and self.direction == (-1, 0):
+            self.path = iter([(-1, 0)] * 6)
+            super().pave()
+        elif (coord_x, coord_y) == (-1, tunnel_row) and self.direction == (-1, 0):
+            self.x = maze.width * cell_size - 12
+        elif (coord_x, coord_y) == (tunnel_right, tunnel_row) and self.direction == (1, 0):
+            self.path = iter([(1, 0)] * 6)
+            super().pave()
+        elif (coord_x, coord_y) == (maze.width, tunnel_row) and self.direction == (1, 0):
+            self.x = -1 * cell_size - 10
+        elif self.scatter:
+            if (coord_x, coord_y) != (14, 11) and not self.path:
+                self.start_dispersion((coord_x, coord_y))
+            elif (coord_x, coord_y) == (22, 5):
+                self.path = iter(routes.path(nodes_matrix[5][22], nodes_matrix[1][24]) + [(1, 0)] * 2)
+            elif (coord_x, coord_y) == (26, 1):
+                self.path = iter(routes.path(nodes_matrix[1][26], nodes_matrix[5][23])[1:] + [(-1, 0)])
+            super().pave()
+        elif not self.path:
+            super().pave((pacman.x, pacman.y))
+        else:
+            super().pave()
+
+        if self.direction in [(0.5, 0), (1, 0)]:
+            self.side = 'right'
+        elif self.direction in [(-0.5, 0), (-1, 0)]:
+            self.side = 'left'
+        elif self.direction == (0, 1):
+            self.side = 'down'
+        elif self.direction == (0, -1):
+            self.side = 'up'
+
+        if not self.disarming and not self.run:
+            self.look = (self.name, 'angry' if self.angry else 'normal', self.side)
+
+
+class Pinky(Ghost):
+    name = 'pinky'
+
+    def __init__(self, game, x, y):
+        super().__init__(game, x, y)
+        self.angry = True if self.game.level == 16 else False
+
+    def start_dispersion(self, end):
+        self.path = iter(routes.path(nodes_matrix[end[1]][end[0]], nodes_matrix[1][1]))
+
+    def move(self):
+        pacman, pacman_field = self.game.pacman, self.game.pacman_field
+        coord_y = int((self.y + 11 - 3 * cell_size) // cell_size)
+        coord_x = int((self.x + 11) // cell_size)
+
+        if not self.in_the_game and not self.path:
+            self.path = iter([(0, 1), (0, 1), (0, -1), (0, -1)])
+            super().pave()
+        elif self.disarming and not self.path:
+            diff_x, diff_y = pacman.x - self.x, pacman.y - self.y
+            if 1 <= diff_x <= 48 and 1 <= diff_y <= 48:
+                super().pave((self.x - diff_x, self.y - diff_y))
+            else:
+                direct = pacman_field.toward(coord_x, coord_y)
+                good_directions = {(-1, 0), (1, 0), (0, 1), (0, -1)} - {direct}
+                free_directions = []
+                for dir_ in good_directions:
+                    if maze.kind(coord_x + dir_[0], coord_y + dir_[1]) == FIELD:
+                        free_directions.append(dir_)
+                if direct:
+                    self.path = iter([self.game.random.choice(free_directions) if free_directions else direct])
+                else:
+                    self.path = iter([self.direction] * 7)
+                super().pave()
+        elif (coord_x, coord_y) == (tunnel_left, tunnel_row) and self.direction == (-1, 0):
+            self.path = iter([(-1, 0)] * 6)
+            super().pave()
+        elif (coord_x, coord_y) == (-1, tunnel_row) and self.direction == (-1, 0):
+            self.x = maze.width * cell_size - 12
+        elif (coord_x, coord_y) == (tunnel_right, tunnel_row) and self.direction == (1, 0):
+            self.path = iter([(1, 0)] * 6)
+            super().pave()
+        elif (coord_x, coord_y) == (maze.width, tunnel_row) and self.direction == (1, 0):
+            self.x = -1 * cell_size - 10
+        elif self.scatter:
+            if (coord_x, coord_y) == (6, 5):
+                self.path = iter(routes.path(nodes_matrix[5][6], nodes_matrix[1][2]) + [(-1, 0)])
+            elif (coord_x, coord_y) == (1, 1):
+                self.path = iter(routes.path(nodes_matrix[1][1], nodes_matrix[5][6])[1:])
+            elif not self.path:
+                self.start_dispersion((coord_x, coord_y))
+            super().pave()
+        elif not self.path:
+            super().pave(
+                (pacman.x + pacman.direction[0] * cell_size * 4, pacman.y + pacman.direction[1] * cell_size * 4))
+        else:
+            super().pave()
+
+        if self.direction in [(0.5, 0), (1, 0)]:
+            self.side = 'right'
+        elif self.direction in [(-0.5, 0), (-1, 0)]:
+            self.side = 'left'
+        elif self.direction == (0, 1):
+            self.side = 'down'
+        elif self.direction == (0, -1):
+            self.side = 'up'
+
+        if not self.disarming and not self.run:
+            self.look = (self.name, 'normal', self.side)
+
+
+class Inky(Ghost):
+    name = 'inky'
+
+    def __init__(self, game, x, y):
+        super().__init__(game, x, y)
+        self.angry = True if self.game.level >= 14 else False
+
+    def start_dispersion(self, end):
+        self.path = iter(routes.path(nodes_matrix[end[1]][end[0]], nodes_matrix[23][21]))
+
+    def move(self):
+        pacman, pacman_field = self.game.pacman, self.game.pacman_field
+        coord_y = int((self.y + 11 - 3 * cell_size) // cell_size)
+        coord_x = int((self.x + 11) // cell_size)
+
+        if not self.in_the_game and not self.path:
+            self.path = iter([(0, -1), (0, -1), (0, 1), (0, 1)])
+            super().pave()
+        elif self.disarming and not self.path:
+            diff_x, diff_y = pacman.x - self.x, pacman.y - self.y
+            if 1 <= diff_x <= 48 and 1 <= diff_y <= 48:
+                super().pave((self.x - diff_x, self.y - diff_y))
+            else:
+                direct = pacman_field.toward(coord_x, coord_y)
+                good_directions = {(-1, 0), (1, 0), (0, 1), (0, -1)} - {direct}
+                free_directions = []
+                for dir_ in good_directions:
+                    if maze.kind(coord_x + dir_[0], coord_y + dir_[1]) == FIELD:
+                        free_directions.append(dir_)
+                if direct:
+                    self.path = iter([self.game.random.choice(free_directions) if free_directions else direct])
+                else:
+                    self.path = iter([self.direction] * 7)
+                super().pave()
+        elif (coord_x, coord_y) == (tunnel_left, tunnel_row) and self.direction == (-1, 0):
+            self.path = iter([(-1, 0)] * 6)
+            super().pave()
+        elif (coord_x, coord_y) == (-1, tunnel_row) and self.direction == (-1, 0):
+            self.x = maze.width * cell_size - 12
+        elif (coord_x, coord_y) == (tunnel_right, tunnel_row) and self.direction == (1, 0):
+            self.path = iter([(1, 0)] * 6)
+            super().pave()
+        elif (coord_x, coord_y) == (maze.width, tunnel_row) and self.direction == (1, 0):
+            self.x = -1 * cell_size - 10
+        elif self.scatter:
+            if (coord_x, coord_y) == (21, 23):
+                self.path = iter(routes.path(nodes_matrix[23][21], nodes_matrix[29][22])[1:] + [(-1, 0)] * 3)
+            elif (coord_x, coord_y) == (19, 29):
+                self.path = iter(routes.path(nodes_matrix[29][19], nodes_matrix[23][21]))
+            elif not self.path:
+                self.start_dispersion((coord_x, coord_y))
+            super().pave()
+        elif not self.path:
+            pacman_x = pacman.x + pacman.direction[0] * cell_size * 2
+            pacman_y = pacman.y + pacman.direction[1] * cell_size * 2
+            blinky = self.game.blinky
+            super().pave((blinky.x + (pacman_x - blinky.x) * 2, blinky.y + (pacman_y - blinky.y) * 2))
+        else:
+            super().pave()
+
+        if self.direction in [(0.5, 0), (1, 0)]:
+            self.side = 'right'
+        elif self.direction in [(-0.5, 0), (-1, 0)]:
+            self.side = 'left'
+        elif self.direction == (0, 1):
+            self.side = 'down'
+        elif self.direction == (0, -1):
+            self.side = 'up'
+
+        if not self.disarming and not self.run:
+            self.look = (self.name, 'normal', self.side)
+
+
+class Clyde(Ghost):
+    name = 'clyde'
+
+    def __init__(self, game, x, y):
+        super().__init__(game, x, y)
+        self.angry = True if self.game.level >= 12 else False
+        self.false_scatter = False
+
+    def start_dispersion(self, end):
+        self.path = iter(routes.path(nodes_matrix[end[1]][end[0]], nodes_matrix[23][7]))
+
+    def move(self):
+        pacman, pacman_field = self.game.pacman, self.game.pacman_field
+        coord_y = int((self.y + 11 - 3 * cell_size) // cell_size)
+        coord_x = int((self.x + 11) // cell_size)
+        length_to_pacman = pacman_field.distance(coord_x, coord_y) or 1
+
+        if not self.in_the_game and not self.path:
+            self.path = iter([(0, -1), (0, -1), (0, 1), (0, 1)])
+            super().pave()
+        elif self.disarming and not self.path:
+            diff_x, diff_y = pacman.x - self.x, pacman.y - self.y
+            if 1 <= diff_x <= 48 and 1 <= diff_y <= 48:
+                super().pave((self.x - diff_x, self.y - diff_y))
+            else:
+                direct = pacman_field.toward(coord_x, coord_y)
+                good_directions = {(-1, 0), (1, 0), (0, 1), (0, -1)} - {direct}
+                free_directions = []
+                for dir_ in good_directions:
+                    if maze.kind(coord_x + dir_[0], coord_y + dir_[1]) == FIELD:
+                        free_directions.append(dir_)
+                if direct:
+                    self.path = iter([self.game.random.choice(free_directions) if free_directions else direct])
+                else:
+                    self.path = iter([self.direction] * 7)
+                super().pave()
+        elif (coord_x, coord_y) == (tunnel_left, tunnel_row) and self.direction == (-1, 0):
+            self.path = iter([(-1, 0)] * 6)
+            super().pave()
+        elif (coord_x, coord_y) == (-1, tunnel_row) and self.direction == (-1, 0):
+            self.x = maze.width * cell_size - 12
+        elif (coord_x, coord_y) == (tunnel_right, tunnel_row) and self.direction == (1, 0):
+            self.path = iter([(1, 0)] * 6)
+            super().pave()
+        elif (coord_x, coord_y) == (maze.width, tunnel_row) and self.direction == (1, 0):
+            self.x = -1 * cell_size - 10
+        elif self.scatter or self.false_scatter:
+            if self.false_scatter and length_to_pacman > 8:
+                self.false_scatter = False
+                self.scatter = False
+
+            if (coord_x, coord_y) == (7, 23):
+                self.path = iter(routes.path(nodes_matrix[23][7], nodes_matrix[29][5]) + [(1, 0)] * 2)
+            elif (coord_x, coord_y) == (7, 29):
+                self.path = iter(routes.path(nodes_matrix[29][7], nodes_matrix[23][7])[1:])
+            elif not self.path:
+                self.start_dispersion((coord_x, coord_y))
+
+            super().pave()
+        elif not self.path:
+            if length_to_pacman <= 8:
+                self.false_scatter = True
+                self.scatter = True
+            else:
+                super().pave((pacman.x, pacman.y))
+        else:
+            super().pave()
+
+        if self.direction in [(0.5, 0), (1, 0)]:
+            self.side = 'right'
+        elif self.direction in [(-0.5, 0), (-1, 0)]:
+            self.side = 'left'
+        elif self.direction == (0, 1):
+            self.side = 'down'
+        elif self.direction == (0, -1):
+            self.side = 'up'
+
+        if not self.disarming and not self.run:
+            self.look = (self.name, 'normal', self.side)
+
+
+class TotalPoints:
+    def __init__(self, high_score=None):
+        self.points = 0
+        self.lifes = 3
+        self.fruits = 0
+        self.last_ten_thousand = 0
+        self.high_score = read_high_score() if high_score is None else high_score
+
+    def increase_points(self, num):
+        self.points += num
+        self.increase_lifes()
+
+    def increase_lifes(self, cheat=False):
+        if self.points // 10000 != self.last_ten_thousand:
+            self.lifes += 1 if self.lifes < 5 else 0
+            self.last_ten_thousand = self.points // 10000
+        elif cheat:
+            self.lifes += 1 if self.lifes < 5 else 0
+
+    def eat_fruit(self):
+        if self.next_by_order == 'cherry':
+            self.points += 100
+        elif self.next_by_order == 'strawberry':
+            self.points += 300
+        elif self.next_by_order == 'peach':
+            self.points += 500
+        elif self.next_by_order == 'apple':
+            self.points += 700
+        elif self.next_by_order == 'melon':
+            self.points += 1000
+        elif self.next_by_order == 'spaceship':
+            self.points += 2000
+        elif self.next_by_order == 'bell':
+            self.points += 3000
+        elif self.next_by_order == 'key':
+            self.points += 5000
+
+        self.increase_lifes()
+
+        self.fruits += 1 if self.fruits < len(fruits_order) - 1 else 0
+
+    def show_fruit(self):
+        if self.fruits + 1 < len(fruits_order):
+            self.next_by_order = fruits_order[self.fruits + 1][-1]
+        fruits_to_show = fruits_order[self.fruits]
+        return (fruits_to_show, self.next_by_order)
+
+
+class Fruit:
+    cells = ((13, 17), (14, 17))  # Клетки, на которых лежит фрукт
+
+    def __init__(self, x, y, name):
+        self.x, self.y = x, y
+        self.name = name
+
+
+class GameState:
+    '''Состояние игры без окна и звука: Пакман, призраки, еда, таймеры и очки.
+    Один вызов step() — один кадр игры при fps кадрах в секунду. step() возвращает список событий
+    (название, данные), по которым интерфейс проигрывает звуки и анимации.'''
+    def __init__(self, level=1, totalpoints: Optional[TotalPoints] = None, seed: Optional[int] = None):
+        self.totalpoints = totalpoints if totalpoints is not None else TotalPoints()
+        # Все случайные решения призраков берутся из своего генератора, поэтому игру с тем же зерном
+        # и теми же нажатиями можно повторить тик в тик.
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.random = random.Random(self.seed)
+        self.ticks = 0  # Тиков с начала игры, не сбрасывается между жизнями и уровнями
+        self.start_level(level)
+
+    def start_level(self, level):
+        self.level = level
+        # У каждой игры своя копия лабиринта, потому что съеденная еда отмечается прямо в нём.
+        self.maze: Maze = maze.copy()
+        self.energizers = self.maze.positions(ENERGIZER)
+        self.food_total = self.food_left = self.maze.food_count()
+        self.fruit, self.fruit_spawned = None, self.food_left
+        self.clear_frame = 0
+        self.reset_actors()
+
+    def restart(self):
+        # После потери жизни еда остаётся на месте, а фрукт пропадает.
+        self.fruit, self.fruit_spawned = None, self.food_left
+        self.clear_frame = fps * 7 - 1
+        self.reset_actors()
+
+    def reset_actors(self):
+        self.global_frame, self.seconds = 0, 0
+        self.disarming, self.won, self.dying = False, False, False
+        self.pacman_field = DistanceField(routes)
+
+        self.pacman = Pac_man(self, cell_size * 14 - 11, cell_size * 26 - 11, (0, 0))
+        self.blinky = Blinky(self, cell_size * 14 - 11, cell_size * 11 - 11 + 3 * cell_size)
+        self.pinky = Pinky(self, cell_size * 13.5 - 11, cell_size * 13 - 11 + 3 * cell_size)
+        self.inky = Inky(self, cell_size * 11.5 - 11, cell_size * 15 - 11 + 3 * cell_size)
+        self.clyde = Clyde(self, cell_size * 15.5 - 11, cell_size * 15 - 11 + 3 * cell_size)
+        self.ghosts = (self.blinky, self.pinky, self.inky, self.clyde)
+
+    def lose_life(self) -> bool:
+        self.totalpoints.lifes -= 1
+        if self.totalpoints.lifes > 0:
+            self.restart()
+            return True
+        return False
+
+    def snapshot(self) -> tuple:
+        # Всё, по чему можно сравнить две игры: используется для проверки повторов.
+        return (self.ticks, self.level, self.totalpoints.points, self.totalpoints.lifes, self.food_left,
+                tuple((actor.x, actor.y) for actor in (self.pacman,) + self.ghosts))
+
+    @property
+    def siren_level(self) -> int:
+        return (self.food_total - self.food_left) // 49 + 1 if not self.disarming else -1
+
+    def eat_food(self) -> Optional[Tuple[str, object]]:
+        row, column = self.pacman.path
+        if not (0 <= row < self.maze.height and 0 <= column < self.maze.lengths[row]):
+            return None
+
+        index = row * self.maze.stride + column
+        food = self.maze.food[index]
+        if food == ENERGIZER:
+            self.totalpoints.increase_points(50)
+            for g in self.ghosts:
+                g.update_time()
+                if g.in_the_game:
+                    g.path = None
+                g.disarming = True
+            self.disarming = True
+        if food:
+            event = ('eat_energizer' if food == ENERGIZER else 'eat_point', (column, row))
+            self.totalpoints.increase_points(10)
+            self.maze.food[index] = 0
+            self.food_left -= 1
+            return event
+        if self.fruit and (column, row) in Fruit.cells:
+            fruit, self.fruit = self.fruit, None
+            self.totalpoints.eat_fruit()
+            return 'eat_fruit', fruit
+        return None
+
+    def step(self, direction: Optional[Tuple[int, int]] = None) -> List[Tuple[str, object]]:
+        events = []
+        pacman, ghosts = self.pacman, self.ghosts
+        blinky, pinky, inky, clyde = ghosts
+        if direction:
+            pacman.player_direction = direction
+
+        if self.food_left in (174, 74) and not self.fruit and self.fruit_spawned != self.food_left:
+            self.fruit = Fruit(cell_size * 13.5 - 11, cell_size * 20 - 11, self.totalpoints.show_fruit()[1])
+            self.fruit_spawned = self.food_left
+            events.append(('fruit', self.fruit))
+
+        with profiler.scope('eat_food'):
+            eaten = self.eat_food()
+        if eaten:
+            events.append(eaten)
+
+        self.ticks += 1
+        self.global_frame += 1
+        self.clear_frame += 1 if not self.disarming else 0
+        self.seconds, clear_seconds = self.global_frame / fps, self.clear_frame / fps
+        level, eaten_food = self.level, self.food_total - self.food_left
+
+        for _ in range(3):
+            pacman.move()
+        pacman.frames()
+
+        self.pacman_field.update(int((pacman.x + 11) // cell_size), int((pacman.y + 11 - 3 * cell_size) // cell_size))
+        blinky.move('agressive' if self.food_left <= 20 + level * 14 else 'normal')
+        for ghost in pinky, inky, clyde:
+            ghost.move()
+
+        not_equal_disarming = all([g.disarming != self.disarming for g in ghosts])
+        for ghost in ghosts:
+            if not_equal_disarming:
+                ghost.disarming = self.disarming
+
+        if clear_seconds >= 7 - level * 0.4375 and not pinky.in_the_game and not self.disarming:
+            pinky.path = iter([(0, -1)] * 3 + [(0.5, 0)])
+            pinky.in_the_game = True
+        if eaten_food >= (54 - 4 * level) and not inky.in_the_game and not self.disarming:
+            inky.path = iter([(1, 0)] * 2 + [(0, -1)] * 3 + [(0.5, 0)])
+            inky.in_the_game = True
+        if eaten_food >= (96 - 6 * level) and not clyde.in_the_game and not self.disarming:
+            clyde.path = iter([(-1, 0)] * 1 + [(0, -1)] * 3 + [(0.5, 0)])
+            clyde.in_the_game = True
+
+        if clear_seconds == 7:
+            for ghost in ghosts:
+                ghost.scatter = False
+        if clear_seconds == 27:
+            for ghost in ghosts:
+                ghost.scatter = True
+        if clear_seconds == 34 - 2 * (level >= 4) - 2 * (level >= 10):
+            for ghost in ghosts:
+                ghost.scatter = False
+        if clear_seconds == 54 - 2 * (level >= 4) - 2 * (level >= 10):
+            for ghost in ghosts:
+                ghost.scatter = True
+        if clear_seconds == 59 - 4 * (level >= 4) - 4 * (level >= 10):
+            for ghost in ghosts:
+                ghost.scatter = False
+        if clear_seconds == 79 + 4 * (level >= 4) + 4 * (level >= 10):
+            for ghost in ghosts:
+                ghost.scatter = True
+        if clear_seconds == 84 + 4 * (level >= 4) + 4 * (level >= 10):
+            for ghost in ghosts:
+                ghost.scatter = False
+
+        if not self.food_left and not self.fruit:
+            self.won = True
+            events.append(('clear', None))
+
+        if self.global_frame % 6 == 0:
+            for ghost in ghosts:
+                if not ghost.disarming and collide(pacman, ghost):
+                    # Уровень, пройденный в этот же тик, засчитывается, а поимка — нет. Так все, кто разбирает
+                    # события (игра, simulate, env, batch), приходят к одному состоянию.
+                    if not self.won:
+                        self.dying = True
+                        events.append(('death', ghost))
+                    break
+            else:
+                for ghost in ghosts:
+                    if ghost.disarming and not ghost.run and collide(pacman, ghost):
+                        ghost.run = True
+                        events.append(('eat_ghost', ghost))
+
+        return events
+
+
+def simulate(state: GameState, policy, max_ticks: int) -> int:
+    '''Играет без окна: policy(state) возвращает направление Пакмана или None.
+    После смерти игра продолжается с тем же уровнем, после победы — со следующим.
+    Возвращает число сыгранных тиков.'''
+    for tick in range(max_ticks):
+        for name, _ in state.step(policy(state)):
+            if name == 'death' and not state.lose_life():
+                return tick + 1
+            if name == 'clear':
+                if state.level == 16:
+                    return tick + 1
+                state.start_level(state.level + 1)
+    return max_ticks
+
+
+if __name__ == '__main__':
+    import time
+
+    bot = random.Random(0)
+
+    def random_policy(state):
+        return bot.choice(((-1, 0), (1, 0), (0, -1), (0, 1))) if state.global_frame % 40 == 0 else None
+
+    game = GameState(seed=0)
+    start = time.perf_counter()
+    ticks = simulate(game, random_policy, 100000)
+    elapsed = time.perf_counter() - start
+    print('{} тиков за {:.2f} с ({:.0f} тиков/с), уровень {}, очки {}'.format(
+        ticks, elapsed, ticks / elapsed, game.level, game.totalpoints.points))
@@ -0,0 +1,161 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from maps import WALL, POINT, ENERGIZER
+from mapfile import maze
+from engine import GameState, TotalPoints
+from global_values import cell_size, directions
+
+
+# Действие — номер в этом кортеже: 0 — не менять направление, 1–4 — влево, вправо, вверх, вниз.
+actions = (None,) + directions
+# Режимы призраков в наблюдении modes.
+modes = ('house', 'chase', 'scatter', 'frightened', 'eaten')
+
+height, width = maze.height, maze.width
+# В строке туннеля есть лишняя клетка x = 28 за краем экрана, в наблюдение она не входит.
+walls = (np.frombuffer(maze.kinds, dtype=np.uint8).reshape(height, maze.stride)[:, :width] == WALL).astype(np.uint8)
+walls.setflags(write=False)  # Лабиринт не меняется, одна сетка на все среды
+
+
+class PacmanEnv:
+    '''Среда в духе Gym поверх GameState: reset() и step(action) без окна и поверхностей pygame.
+    Наблюдение — словарь массивов NumPy:
+    walls (31, 28) — 1 для стены; pellets (31, 28) — 1 для точки, 2 для энерджайзера;
+    positions (5, 2) — координаты Пакмана и призраков (blinky, pinky, inky, clyde) в клетках;
+    modes (4,) — номер режима призрака из modes.
+    Массивы наблюдения переписываются следующим шагом, для хранения их нужно копировать.
+    Награда — очки за шаг. После потери жизни игра продолжается, после прохождения уровня начинается
+    следующий; эпизод кончается с последней жизнью, после 16 уровня или через max_ticks тиков.'''
+    def __init__(self, level=1, seed: Optional[int] = None, frame_skip=1, max_ticks: Optional[int] = None,
+                 buffers: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None):
+        self.level, self.seed = level, seed
+        self.frame_skip = frame_skip  # Тиков игры на одно действие
+        self.max_ticks = max_ticks
+        # Векторная среда передаёт сюда срезы своих общих массивов, чтобы не собирать их на каждом шаге.
+        self.pellets, self.positions, self.modes = buffers if buffers is not None else (
+            np.zeros((height, width), dtype=np.uint8), np.zeros((5, 2), dtype=np.float32),
+            np.zeros(4, dtype=np.int8))
+        self.state = None
+
+    def reset(self, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+        if seed is not None:
+            self.seed = seed
+        self.state = GameState(self.level, TotalPoints(high_score='0'), seed=self.seed)
+        # Следующий reset() без зерна даёт новую, но тоже повторяемую игру.
+        self.seed = self.state.random.randrange(2 ** 32)
+        self.fill_pellets()
+        self.update_actors()
+        return self.observation()
+
+    def step(self, action: int) -> Tuple[Dict[str, np.ndarray], float, bool, Dict[str, object]]:
+        state = self.state
+        points = state.totalpoints.points
+        direction, done, names = actions[action], False, []
+
+        for _ in range(self.frame_skip):
+            for name, data in state.step(direction):
+                names.append(name)
+                if name in ('eat_point', 'eat_energizer'):
+                    self.pellets[data[1], data[0]] = 0
+                elif name == 'death':
+                    done = not state.lose_life()
+                elif name == 'clear':
+                    if state.level == 16:
+                        done = True
+                    else:
+                        state.start_level(state.level + 1)
+                        self.fill_pellets()
+            direction = None
+            if done or self.max_ticks and state.ticks >= self.max_ticks:
+                done = True
+                break
+
+        self.update_actors()
+        info = {'events': names, 'level': state.level, 'lifes': state.totalpoints.lifes, 'ticks': state.ticks}
+        return self.observation(), float(state.totalpoints.points - points), done, info
+
+    def observation(self) -> Dict[str, np.ndarray]:
+        return {'walls': walls, 'pellets': self.pellets, 'positions': self.positions, 'modes': self.modes}
+
+    def fill_pellets(self):
+        food = np.frombuffer(self.state.maze.food, dtype=np.uint8).reshape(height, maze.stride)[:, :width]
+        self.pellets[:] = (food == POINT) + 2 * (food == ENERGIZER)
+
+    def update_actors(self):
+        state = self.state
+        for i, actor in enumerate((state.pacman,) + state.ghosts):
+            self.positions[i] = (actor.x + 11) / cell_size, (actor.y + 11) / cell_size - 3
+        for i, ghost in enumerate(state.ghosts):
+            self.modes[i] = (4 if ghost.run else 3 if ghost.disarming else 0 if not ghost.in_the_game
+                             else 2 if ghost.scatter else 1)
+
+
+class VecPacmanEnv:
+    '''count сред, которые шагают одним вызовом step(actions). Наблюдения лежат в общих массивах
+    с первой осью по средам, награды и признаки конца — массивы длины count.
+    Закончившаяся среда сразу начинает новый эпизод, а её последнее наблюдение остаётся в info.'''
+    def __init__(self, count: int, level=1, seed=0, frame_skip=1, max_ticks: Optional[int] = None):
+        self.pellets = np.zeros((count, height, width), dtype=np.uint8)
+        self.positions = np.zeros((count, 5, 2), dtype=np.float32)
+        self.modes = np.zeros((count, 4), dtype=np.int8)
+        self.walls = np.broadcast_to(walls, (count, height, width))
+        self.envs = [PacmanEnv(level, seed + i, frame_skip, max_ticks,
+                               buffers=(self.pellets[i], self.positions[i], self.modes[i]))
+                     for i in range(count)]
+        self.rewards = np.zeros(count, dtype=np.float32)
+        self.dones = np.zeros(count, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.envs)
+
+    def reset(self) -> Dict[str, np.ndarray]:
+        for env in self.envs:
+            env.reset()
+        return self.observation()
+
+    def step(self, actions) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray, List[Dict[str, object]]]:
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            observation, self.rewards[i], self.dones[i], info = env.step(int(action))
+            if self.dones[i]:
+                info['final_observation'] = {name: array.copy() for name, array in observation.items()}
+                env.reset()
+            infos.append(info)
+        return self.observation(), self.rewards, self.dones, infos
+
+    def observation(self) -> Dict[str, np.ndarray]:
+        return {'walls': self.walls, 'pellets': self.pellets, 'positions': self.positions, 'modes': self.modes}
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Скорость среды: шагов среды в секунду со случайными действиями')
+    parser.add_argument('-k', '--envs', type=int, default=8, help='сред в векторной среде')
+    parser.add_argument('--steps', type=int, default=20000, help='шагов на замер')
+    parser.add_argument('--frame-skip', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    env = PacmanEnv(seed=0, frame_skip=args.frame_skip)
+    env.reset()
+    start = time.perf_counter()
+    for action in rng.integers(len(actions), size=args.steps):
+        if env.step(action)[2]:
+            env.reset()
+    elapsed = time.perf_counter() - start
+    print('одна среда: {:.0f} шагов/с'.format(args.steps / elapsed))
+
+    vec = VecPacmanEnv(args.envs, seed=0, frame_skip=args.frame_skip)
+    vec.reset()
+    calls = max(1, args.steps // args.envs)
+    start = time.perf_counter()
+    for _ in range(calls):
+        vec.step(rng.integers(len(actions), size=args.envs))
+    elapsed = time.perf_counter() - start
+    print('{} сред: {:.0f} шагов/с ({:.0f} вызовов step/с)'.format(
+        args.envs, calls * args.envs / elapsed, calls / elapsed))
@@ -0,0 +1,76 @@
+from typing import Dict, Tuple
+
+import pygame
+import pygame.font
+
+from global_values import cell_size, size, fruits_order
+from sprites import sprites
+
+
+class Hud:
+    '''Счётчики над и под лабиринтом: очки, рекорд, звук, жизни и фрукты.
+    Каждая часть хранится готовой поверхностью и перерисовывается, только когда меняются её данные.'''
+    color = '#dedeff'
+
+    def __init__(self):
+        self.font = None
+        self.labels = []
+        self.digits: Dict[str, pygame.Surface] = {}
+        self.layers: Dict[str, Tuple[object, pygame.Surface]] = {}
+
+    def prepare(self):
+        self.font = pygame.font.Font('data/PacMan Font.ttf', 24)
+        self.labels = [(self.font.render(text, True, self.color), position)
+                       for text, position in (('1UP', (72, 0)), ('HIGH', (216, 0)), ('SCORE', (336, 0)))]
+        self.digits = {digit: self.font.render(digit, True, self.color) for digit in '0123456789'}
+
+    def render_number(self, number) -> pygame.Surface:
+        text = str(min(int(number), 999999)).rjust(6, '0')
+        glyphs = [self.digits[digit] for digit in text]
+        surface = pygame.Surface((sum(g.get_width() for g in glyphs), glyphs[0].get_height()), pygame.SRCALPHA)
+        x = 0
+        for glyph in glyphs:
+            surface.blit(glyph, (x, 0))
+            x += glyph.get_width()
+        return surface
+
+    @staticmethod
+    def render_lifes(lifes) -> pygame.Surface:
+        life = sprites.get('other', 'life')
+        surface = pygame.Surface((45 * 4, 45), pygame.SRCALPHA)
+        for i in range(lifes - 1):
+            surface.blit(life, (45 * i, 0))
+        return surface
+
+    @staticmethod
+    def render_fruits(fruits) -> pygame.Surface:
+        shown = fruits_order[fruits]
+        surface = pygame.Surface((45 * 7, 45), pygame.SRCALPHA)
+        for i in range(len(shown)):
+            surface.blit(sprites.get('fruits', shown[i]), (45 * 6 - 45 * i, 0))
+        return surface
+
+    def layer(self, name, key, render) -> pygame.Surface:
+        cached = self.layers.get(name)
+        if cached is None or cached[0] != key:
+            cached = (key, render(key))
+            self.layers[name] = cached
+        return cached[1]
+
+    def draw(self, surface: pygame.Surface, points, high_score, lifes, fruits, play_sound):
+        if self.font is None:
+            self.prepare()
+
+        for text, position in self.labels:
+            surface.blit(text, position)
+        surface.blit(self.layer('points', points, self.render_number), (24, 24))
+        surface.blit(self.layer('high_score', high_score, self.render_number), (264, 24))
+
+        surface.fill('#000000', (605, 0, 48, 48))
+        surface.blit(sprites.get('other', 'volume_on' if play_sound else 'volume_off'), (size[0] - 67, 0))
+
+        surface.blit(self.layer('lifes', lifes, self.render_lifes), (16, 34 * cell_size))
+        surface.blit(self.layer('fruits', fruits, self.render_fruits), (26 * cell_size - 16 - 45 * 6, 34 * cell_size))
+
+
+hud = Hud()
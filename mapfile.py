@@ -0,0 +1,83 @@
+import hashlib
+import os
+import pickle
+import sys
+import time
+from typing import FrozenSet, List, Optional, Tuple
+
+from maps import Cell, Maze
+from routing import JunctionGraph, RoutingTable
+
+
+map_path = 'data/maps/original.txt'
+cache_dir = 'data/maps/cache'
+# Меняется вместе с устройством GameMap, Maze, RoutingTable или JunctionGraph, чтобы не читать старый кеш.
+cache_version = 3
+
+
+class GameMap:
+    '''Скомпилированная карта: лабиринт со стенами и едой, развилки, где призраки заново выбирают путь,
+    туннель, таблица маршрутов между всеми клетками и граф коридоров между развилками для призраков.'''
+    def __init__(self, rows: List[str]):
+        self.maze = Maze(rows)
+        self.junctions: FrozenSet[Tuple[int, int]] = frozenset(self.maze.junctions())
+        self.tunnel: Optional[Tuple[int, int, int]] = self.maze.tunnel()  # Строка, конец туннеля слева и справа
+        self.routes = RoutingTable(self.maze)
+        self.graph = JunctionGraph(self.routes)
+
+
+def read_rows(text: str) -> List[str]:
+    # Строки карты без пустых строк и комментариев, которые начинаются с #.
+    return [line.rstrip('\r') for line in text.split('\n') if line.strip() and not line.startswith('#')]
+
+
+def load_map(path: str = map_path) -> GameMap:
+    '''Читает карту из текстового файла. Скомпилированная карта хранится в cache_dir под хешем файла,
+    поэтому пересобирается только после изменения карты.'''
+    with open(path, 'rb') as file:
+        data = file.read()
+    name = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha1(data + str(cache_version).encode()).hexdigest()[:16]
+    cache = os.path.join(cache_dir, '{}-{}.pickle'.format(name, digest))
+    try:
+        with open(cache, 'rb') as file:
+            return pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        pass
+
+    game_map = GameMap(read_rows(data.decode('utf-8')))
+    try:
+        # Несколько процессов (batch.py) могут собирать карту одновременно, поэтому файл заменяется целиком.
+        os.makedirs(cache_dir, exist_ok=True)
+        for old in os.listdir(cache_dir):
+            if old.startswith(name + '-') and old.endswith('.pickle') and old != os.path.basename(cache):
+                os.remove(os.path.join(cache_dir, old))
+        temporary = '{}.{}'.format(cache, os.getpid())
+        with open(temporary, 'wb') as file:
+            pickle.dump(game_map, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, cache)
+    except OSError:
+        pass  # Без кеша карта просто собирается при каждом запуске
+    return game_map
+
+
+game_map = load_map()
+maze = game_map.maze  # Общий лабиринт для стен и путей. У каждой игры своя копия с едой (GameState.maze)
+nodes_matrix: List[List[Cell]] = maze.cells
+routes = game_map.routes
+graph = game_map.graph
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else map_path
+    for label, clear in (('без кеша', True), ('из кеша', False)):
+        if clear and os.path.isdir(cache_dir):
+            for old in os.listdir(cache_dir):
+                os.remove(os.path.join(cache_dir, old))
+        start = time.perf_counter()
+        loaded = load_map(path)
+        print('Карта {} {}: {:.1f} мс'.format(path, label, (time.perf_counter() - start) * 1000))
+    print('{}x{}, клеток поля {}, еды {}, развилок {}, туннель {}, дом призраков {} клеток'.format(
+        loaded.maze.width, loaded.maze.height, len(loaded.routes.cells), loaded.maze.food_count(),
+        len(loaded.junctions), loaded.tunnel, len(loaded.maze.house)))
+    print('Граф коридоров: узлов {}, коридоров {}'.format(len(loaded.graph.nodes), len(loaded.graph.edges) // 2))
@@ -0,0 +1,141 @@
+import csv
+import json
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+
+class Scope:
+    '''Замер одной части кадра: with profiler.scope('flip'): ...
+    Если часть выполняется за кадр несколько раз (тики досчёта), время складывается.'''
+    def __init__(self, profiler: 'FrameProfiler', name: str):
+        self.profiler, self.name = profiler, name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add(self.name, self.start, time.perf_counter())
+
+
+class FrameProfiler:
+    '''Время частей кадра игрового цикла: скользящее среднее и p99 за последние window кадров.
+    Окно со статистикой включается клавишей F3. Если задан файл экспорта, время каждой части каждого
+    кадра сохраняется и при выходе записывается в CSV или в JSON событий Chrome trace (chrome://tracing).'''
+    color, background = '#dedeff', (0, 0, 0, 170)
+    refresh = 15  # Раз во сколько кадров пересчитывать текст окна
+
+    def __init__(self, window: int = 120):
+        self.window = window
+        self.visible = False
+        self.export_path: Optional[str] = None
+
+        self.scopes: Dict[str, Scope] = {}
+        self.history: Dict[str, Deque[float]] = {}
+        self.current: Dict[str, float] = {}
+        self.spans: List[Tuple[str, float, float]] = []  # Части текущего кадра для trace: имя, начало, конец
+        self.frames: List[Tuple[float, float, Dict[str, float], List[Tuple[str, float, float]]]] = []
+        self.frame_start, self.frame_count = None, 0
+
+        self.font = None
+        self.overlay: Optional['pygame.Surface'] = None
+
+    def scope(self, name: str) -> Scope:
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = Scope(self, name)
+        return scope
+
+    def add(self, name: str, start: float, end: float):
+        if self.frame_start is None:
+            return  # Вне игрового цикла (заставки, начало уровня) время не считается
+        self.current[name] = self.current.get(name, 0) + end - start
+        if self.export_path:
+            self.spans.append((name, start, end))
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        end = time.perf_counter()
+        self.current['frame'] = end - self.frame_start
+        for name, seconds in self.current.items():
+            if name not in self.history:
+                self.history[name] = deque(maxlen=self.window)
+            self.history[name].append(seconds)
+        # Части, которых в этом кадре не было, идут в статистику нулём.
+        for name, values in self.history.items():
+            if name not in self.current:
+                values.append(0)
+        if self.export_path:
+            self.frames.append((self.frame_start, end, self.current, self.spans))
+        self.current, self.spans = {}, []
+        self.frame_start = None
+        self.frame_count += 1
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.overlay = None
+
+    def stats(self) -> Dict[str, Tuple[float, float]]:
+        # Среднее и 99-й процентиль в миллисекундах.
+        result = {}
+        for name, values in self.history.items():
+            ordered = sorted(values)
+            result[name] = (sum(ordered) / len(ordered) * 1000, ordered[int(len(ordered) * 0.99)] * 1000)
+        return result
+
+    def render_overlay(self) -> 'pygame.Surface':
+        # pygame нужен только окну статистики: движок без окна (batch.py, env.py) тоже пишет в профилировщик.
+        import pygame.font
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+        stats = self.stats()
+        lines = ['{:<12}{:>7}{:>7}'.format('ms', 'avg', 'p99')] + [
+            '{:<12}{:>7.2f}{:>7.2f}'.format(name, *stats[name]) for name in sorted(stats, key=lambda n: -stats[n][0])]
+        rendered = [self.font.render(line, True, self.color) for line in lines]
+        height = rendered[0].get_height()
+        surface = pygame.Surface((max(text.get_width() for text in rendered) + 12, height * len(rendered) + 8),
+                                 pygame.SRCALPHA)
+        surface.fill(self.background)
+        for i, text in enumerate(rendered):
+            surface.blit(text, (6, 4 + i * height))
+        return surface
+
+    def draw(self, blit: Callable, position=(4, 76)):
+        if not self.visible or not self.history:
+            return
+        if self.overlay is None or self.frame_count % self.refresh == 0:
+            self.overlay = self.render_overlay()
+        blit(self.overlay, position)
+
+    def export(self, path: Optional[str] = None):
+        path = path or self.export_path
+        if not path or not self.frames:
+            return
+        if path.endswith('.json'):
+            # Формат событий Chrome trace: полные события ph = X с началом и длительностью в микросекундах.
+            origin = self.frames[0][0]
+            events = []
+            for i, (start, end, _, spans) in enumerate(self.frames):
+                events.append({'name': 'frame', 'ph': 'X', 'pid': 0, 'tid': 0, 'args': {'frame': i},
+                               'ts': (start - origin) * 1e6, 'dur': (end - start) * 1e6})
+                events.extend({'name': name, 'ph': 'X', 'pid': 0, 'tid': 0,
+                               'ts': (span_start - origin) * 1e6, 'dur': (span_end - span_start) * 1e6}
+                              for name, span_start, span_end in spans)
+            with open(path, 'w') as file:
+                json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+        else:
+            names = sorted({name for _, _, parts, _ in self.frames for name in parts})
+            with open(path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['frame'] + [name + '_ms' for name in names])
+                for i, (_, _, parts, _) in enumerate(self.frames):
+                    writer.writerow([i] + ['{:.4f}'.format(parts.get(name, 0) * 1000) for name in names])
+
+
+profiler = FrameProfiler()
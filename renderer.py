@@ -0,0 +1,77 @@
+from typing import List
+
+import pygame
+import pygame.display
+
+from global_values import cell_size, size
+from hud import hud
+
+
+class DirtyRenderer:
+    '''Отрисовка грязными прямоугольниками.
+    Фон (лабиринт, еда и счётчики) хранится отдельной поверхностью. Каждый кадр под движущимися
+    спрайтами фон восстанавливается, а на экран выводятся только изменившиеся прямоугольники.'''
+    hud_bands = (pygame.Rect(0, 0, size[0], 3 * cell_size), pygame.Rect(0, 34 * cell_size, size[0], 2 * cell_size))
+
+    def __init__(self, screen: pygame.Surface, maze: pygame.Surface, food_sprites: pygame.sprite.Group):
+        self.screen = screen
+        self.maze = maze
+        self.backdrop = maze.copy()
+        food_sprites.draw(self.backdrop)
+        self.hud_state = None
+
+        self.previous: List[pygame.Rect] = []
+        self.current: List[pygame.Rect] = []
+        self.full = True
+
+    def reset(self, food_sprites: pygame.sprite.Group):
+        # Новая жизнь или новый уровень: фон собирается заново, а экран перерисовывается целиком.
+        self.backdrop.blit(self.maze, (0, 0))
+        food_sprites.draw(self.backdrop)
+        self.hud_state = None
+        self.previous, self.current = [], []
+        self.full = True
+
+    def begin(self):
+        # Восстановление фона там, где в прошлом кадре что-то рисовалось поверх него.
+        if self.full:
+            self.screen.blit(self.backdrop, (0, 0))
+        else:
+            for rect in self.previous:
+                self.screen.blit(self.backdrop, rect, rect)
+
+    def invalidate(self):
+        self.full = True
+
+    def mark(self, rect):
+        self.current.append(pygame.Rect(rect))
+
+    def draw(self, image: pygame.Surface, position):
+        self.mark(self.screen.blit(image, position).inflate(2, 2))
+
+    def erase(self, rect):
+        self.backdrop.blit(self.maze, rect, rect)
+        self.mark(rect)
+
+    def add(self, sprite: pygame.sprite.Sprite):
+        self.backdrop.blit(sprite.image, sprite.rect)
+        self.mark(sprite.rect)
+
+    def update_hud(self, points, high_score, lifes, fruits, play_sound):
+        state = (points, high_score, lifes, fruits, play_sound)
+        if state != self.hud_state:
+            for band in self.hud_bands:
+                self.backdrop.blit(self.maze, band, band)
+            hud.draw(self.backdrop, *state)
+            for band in self.hud_bands:
+                self.screen.blit(self.backdrop, band, band)
+                self.mark(band)
+            self.hud_state = state
+
+    def present(self):
+        if self.full:
+            pygame.display.flip()
+            self.full = False
+        else:
+            pygame.display.update(self.previous + self.current)
+        self.previous, self.current = self.current, []
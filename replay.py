@@ -0,0 +1,86 @@
+import argparse
+import struct
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+from engine import GameState, TotalPoints, simulate
+from global_values import directions
+
+
+magic = b'MMRP'
+header = struct.Struct('<4sBIBI')  # Метка, версия, зерно, начальный уровень, длина игры в тиках
+change = struct.Struct('<IB')  # Тик и номер направления в directions
+
+
+class Recording:
+    '''Запись игры: зерно случайных чисел, начальный уровень и тики, на которых игрок нажимал направление.
+    Этого достаточно, чтобы движок повторил игру тик в тик.'''
+    version = 3  # 2: развилки найдены по карте; 3: призраки ищут путь по графу коридоров
+
+    def __init__(self, seed: int, level: int = 1, changes: Optional[List[Tuple[int, Tuple[int, int]]]] = None,
+                 length: int = 0):
+        self.seed, self.level, self.length = seed, level, length
+        self.changes = changes if changes is not None else []
+
+    def record(self, tick: int, direction: Optional[Tuple[int, int]]):
+        if direction:
+            self.changes.append((tick, direction))
+
+    def save(self, path: str, length: int):
+        self.length = length
+        with open(path, 'wb') as file:
+            file.write(header.pack(magic, self.version, self.seed, self.level, self.length))
+            for tick, direction in self.changes:
+                file.write(change.pack(tick, directions.index(direction)))
+
+    @classmethod
+    def load(cls, path: str) -> 'Recording':
+        with open(path, 'rb') as file:
+            data = file.read()
+        mark, version, seed, level, length = header.unpack_from(data)
+        if mark != magic or version != cls.version:
+            raise ValueError('{} is not a replay file'.format(path))
+        changes = [(tick, directions[d]) for tick, d in change.iter_unpack(data[header.size:])]
+        return cls(seed, level, changes, length)
+
+    def new_game(self, totalpoints: Optional[TotalPoints] = None) -> GameState:
+        return GameState(self.level, totalpoints, seed=self.seed)
+
+
+class Player:
+    '''Выдаёт записанные направления по номеру тика. Подходит как policy для engine.simulate().'''
+    def __init__(self, recording: Recording):
+        self.changes = recording.changes
+        self.position = 0
+
+    def direction(self, tick: int) -> Optional[Tuple[int, int]]:
+        direction = None
+        while self.position < len(self.changes) and self.changes[self.position][0] <= tick:
+            direction = self.changes[self.position][1]
+            self.position += 1
+        return direction
+
+    def __call__(self, state: GameState) -> Optional[Tuple[int, int]]:
+        return self.direction(state.ticks)
+
+
+def replay(recording: Recording) -> GameState:
+    state = recording.new_game(TotalPoints(high_score='0'))
+    simulate(state, Player(recording), recording.length)
+    return state
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Повтор записанной игры без окна, с максимальной скоростью')
+    parser.add_argument('file', help='файл записи (python game.py --record FILE)')
+    args = parser.parse_args()
+
+    game_record = Recording.load(args.file)
+    start = time.perf_counter()
+    game = replay(game_record)
+    elapsed = time.perf_counter() - start
+    snapshot = game.snapshot()
+    print('тиков {}, уровень {}, очки {}, жизни {}, еды осталось {}'.format(*snapshot[:5]))
+    print('контрольная сумма {:08x}, {:.2f} с ({:.0f} тиков/с)'.format(
+        zlib.crc32(repr(snapshot).encode()), elapsed, game.ticks / max(elapsed, 1e-9)))
@@ -0,0 +1,305 @@
+from array import array
+from collections import deque
+from heapq import heappop, heappush
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from maps import Maze, FIELD
+from global_values import directions
+
+
+NO_STEP = 255
+NO_DISTANCE = 0xFFFF
+
+
+class RoutingTable:
+    '''Таблица маршрутов между всеми парами клеток поля.
+    Лабиринт не меняется, поэтому для каждой клетки заранее считается обход в ширину, а в компактных
+    массивах хранятся следующий шаг и расстояние до любой другой клетки.'''
+    def __init__(self, maze: Maze):
+        self.width, self.height = maze.width, maze.height
+        self.lengths = maze.lengths  # Длины строк: строка туннеля длиннее ширины на клетку за краем экрана
+        self.cells = [(x, y) for y in range(self.height) for x in range(self.width)
+                      if maze.kind(x, y) == FIELD]
+        self.index: Dict[Tuple[int, int], int] = {xy: i for i, xy in enumerate(self.cells)}
+
+        # Соседи берутся из масок лабиринта: в них уже только клетки поля в пределах ширины.
+        self.neighbours: List[List[Tuple[int, int]]] = []
+        for x, y in self.cells:
+            mask = maze.neighbours[y * maze.stride + x]
+            self.neighbours.append([(self.index[(x + s_x, y + s_y)], d) for d, (s_x, s_y) in enumerate(directions)
+                                    if mask >> d & 1])
+
+        count = len(self.cells)
+        self.steps = array('B', [NO_STEP]) * (count * count)
+        self.distances = array('H', [NO_DISTANCE]) * (count * count)
+        for goal in range(count):
+            self.build_from(goal)
+
+    def build_from(self, goal: int):
+        # Обход в ширину от цели: для каждой клетки шаг — направление к соседу, который ближе к цели.
+        count = len(self.cells)
+        steps, distances, neighbours = self.steps, self.distances, self.neighbours
+        distances[goal * count + goal] = 0
+        queue = deque([goal])
+        while queue:
+            node = queue.popleft()
+            distance = distances[node * count + goal] + 1
+            for adjacent, d in neighbours[node]:
+                if distances[adjacent * count + goal] == NO_DISTANCE:
+                    distances[adjacent * count + goal] = distance
+                    steps[adjacent * count + goal] = d ^ 1  # Обратное направление: от соседа к node
+                    queue.append(adjacent)
+
+    def wrap(self, x: int, y: int) -> Tuple[int, int]:
+        # Отрицательные координаты, как и maze[y][x], отсчитываются с конца столбца и строки.
+        if -self.height <= y < 0:
+            y += self.height
+        if 0 <= y < self.height and -self.lengths[y] <= x < 0:
+            x += self.lengths[y]
+        return x, y
+
+    def entry(self, x: int, y: int, distances, offset: int = 0, count: int = 1) -> Optional[Tuple[Optional[int], int]]:
+        # Клетка, с которой путь идёт по таблице, и шаг на неё. Призрак может стоять вне таблицы: в двери дома
+        # или в конце туннеля. Тогда, как и в find_path, первый шаг делается на соседнюю клетку поля,
+        # ближайшую к цели. distances[i * count + offset] — расстояние от клетки i до цели.
+        x, y = self.wrap(x, y)
+        i = self.index.get((x, y))
+        if i is not None:
+            return None, i
+        best = None
+        for d, (s_x, s_y) in enumerate(directions):
+            i = self.index.get((x + s_x, y + s_y))
+            if i is not None and distances[i * count + offset] != NO_DISTANCE:
+                if best is None or distances[i * count + offset] < distances[best[1] * count + offset]:
+                    best = (d, i)
+        return best
+
+    def pair(self, start, goal) -> Optional[Tuple[Optional[int], int, int]]:
+        goal_i = self.index.get((goal.x, goal.y))
+        if goal_i is None:
+            return None
+        count = len(self.cells)
+        entry = self.entry(start.x, start.y, self.distances, goal_i, count)
+        if entry is None:
+            return None
+        return entry[0], entry[1] * count + goal_i, goal_i
+
+    def next_step(self, start, goal) -> Optional[Tuple[int, int]]:
+        pair = self.pair(start, goal)
+        if pair is None or self.steps[pair[1]] == NO_STEP and pair[0] is None:
+            return None
+        return directions[pair[0] if pair[0] is not None else self.steps[pair[1]]]
+
+    def distance(self, start, goal) -> Optional[int]:
+        pair = self.pair(start, goal)
+        if pair is None or self.distances[pair[1]] == NO_DISTANCE:
+            return None
+        return self.distances[pair[1]] + (pair[0] is not None)
+
+    def path(self, start, goal) -> Optional[List[Tuple[int, int]]]:
+        # То же, что и find_path: список направлений от start до goal.
+        pair = self.pair(start, goal)
+        if pair is None or self.distances[pair[1]] == NO_DISTANCE:
+            return None
+        count = len(self.cells)
+        entry_step, node, goal_i = pair[0], pair[1] // count, pair[2]
+        sides = [directions[entry_step]] if entry_step is not None else []
+        while node != goal_i:
+            d = self.steps[node * count + goal_i]
+            sides.append(directions[d])
+            x, y = self.cells[node]
+            node = self.index[(x + directions[d][0], y + directions[d][1])]
+        return sides
+
+
+class DistanceField:
+    '''Поле расстояний от одной клетки (клетки Пакмана) до всех клеток поля.
+    Пересчитывается одним обходом в ширину, только когда клетка-источник меняется, а все призраки
+    берут из него расстояние до Пакмана и направление к нему.'''
+    def __init__(self, table: RoutingTable):
+        self.table = table
+        self.origin = None
+        self.distances = array('H', [NO_DISTANCE]) * len(table.cells)
+
+    def update(self, x: int, y: int):
+        if (x, y) == self.origin:
+            return
+        self.origin = (x, y)
+        self.distances = distances = array('H', [NO_DISTANCE]) * len(self.table.cells)
+
+        start = self.table.index.get((x, y))
+        if start is None:
+            return
+        distances[start] = 0
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for adjacent, _ in self.table.neighbours[node]:
+                if distances[adjacent] == NO_DISTANCE:
+                    distances[adjacent] = distances[node] + 1
+                    queue.append(adjacent)
+
+    def distance(self, x: int, y: int) -> Optional[int]:
+        entry = self.table.entry(x, y, self.distances)
+        if entry is None or self.distances[entry[1]] == NO_DISTANCE:
+            return None
+        return self.distances[entry[1]] + (entry[0] is not None)
+
+    def toward(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+        entry = self.table.entry(x, y, self.distances)
+        if entry is None or not self.distances[entry[1]] and entry[0] is None:
+            return None
+        if entry[0] is not None:
+            return directions[entry[0]]
+        distance = self.distances[entry[1]]
+        for adjacent, d in self.table.neighbours[entry[1]]:
+            if self.distances[adjacent] == distance - 1:
+                return directions[d]
+
+    def path(self, x: int, y: int) -> Optional[List[Tuple[int, int]]]:
+        x, y = self.table.wrap(x, y)
+        if self.distance(x, y) is None:
+            return None
+        sides = []
+        side = self.toward(x, y)
+        while side:
+            sides.append(side)
+            x, y = x + side[0], y + side[1]
+            side = self.toward(x, y)
+        return sides
+
+
+NO_EDGE = 0xFFFF
+
+
+class JunctionGraph:
+    '''Лабиринт, сжатый в граф развилок. Узлы — клетки поля, у которых не ровно два соседа: развилки, тупики
+    и клетки дома призраков. Рёбра — коридоры между ними с длиной и направлениями шагов. Кратчайшие пути
+    заранее считаются только между узлами, поэтому таблица растёт с числом развилок, а не с площадью
+    лабиринта. План пути идёт по коридору целиком, а следующий коридор берётся из таблицы только на узле.'''
+    def __init__(self, table: RoutingTable):
+        self.table = table
+        self.nodes = [i for i, adjacent in enumerate(table.neighbours) if len(adjacent) != 2]
+        self.node_index: Dict[int, int] = {cell: n for n, cell in enumerate(self.nodes)}
+
+        # Коридоры парами: ребро 2k идёт в одну сторону, 2k + 1 — тот же коридор в обратную.
+        # Ребро — (узел начала, узел конца, направления шагов).
+        self.edges: List[Tuple[int, int, Tuple[Tuple[int, int], ...]]] = []
+        self.outgoing: List[List[int]] = [[] for _ in self.nodes]
+        self.places: Dict[int, Tuple[int, int]] = {}  # Клетка внутри коридора: ребро 2k и число шагов от его начала
+        walked = set()
+        for n, cell in enumerate(self.nodes):
+            for adjacent, d in table.neighbours[cell]:
+                if (n, d) in walked:
+                    continue
+                previous, sides, inner = cell, [directions[d]], []
+                while adjacent not in self.node_index:
+                    inner.append(adjacent)
+                    previous, (adjacent, d) = adjacent, next(
+                        (following, d) for following, d in table.neighbours[adjacent] if following != previous)
+                    sides.append(directions[d])
+                end, edge = self.node_index[adjacent], len(self.edges)
+                walked.add((end, d ^ 1))
+                self.edges.append((n, end, tuple(sides)))
+                self.edges.append((end, n, tuple((-s_x, -s_y) for s_x, s_y in reversed(sides))))
+                self.outgoing[n].append(edge)
+                self.outgoing[end].append(edge + 1)
+                for k, inner_cell in enumerate(inner, 1):
+                    self.places[inner_cell] = (edge, k)
+
+        count = len(self.nodes)
+        self.distances = array('H', [NO_DISTANCE]) * (count * count)
+        self.first = array('H', [NO_EDGE]) * (count * count)  # Первое ребро кратчайшего пути от узла к узлу
+        for source in range(count):
+            self.build_from(source)
+
+    def build_from(self, source: int):
+        # Дейкстра по коридорам от одного узла.
+        count = len(self.nodes)
+        distances, first, edges = self.distances, self.first, self.edges
+        heap = [(0, source, NO_EDGE)]
+        while heap:
+            distance, node, edge = heappop(heap)
+            if distances[source * count + node] != NO_DISTANCE:
+                continue
+            distances[source * count + node], first[source * count + node] = distance, edge
+            for following in self.outgoing[node]:
+                end = edges[following][1]
+                if distances[source * count + end] == NO_DISTANCE:
+                    heappush(heap, (distance + len(edges[following][2]), end,
+                                    following if node == source else edge))
+
+    def exits(self, cell: int) -> List[Tuple[int, int, int, int, int]]:
+        # Пути от клетки до узлов своего коридора: (узел, длина, ребро, начало и конец среза его направлений).
+        node = self.node_index.get(cell)
+        if node is not None:
+            return [(node, 0, 0, 0, 0)]
+        place = self.places.get(cell)
+        if place is None:
+            return []
+        edge, k = place
+        start, end, sides = self.edges[edge]
+        return [(end, len(sides) - k, edge, k, len(sides)), (start, k, edge + 1, len(sides) - k, len(sides))]
+
+    def entries(self, cell: int) -> List[Tuple[int, int, int, int, int]]:
+        # Пути от узлов коридора до клетки в том же виде, что и exits.
+        node = self.node_index.get(cell)
+        if node is not None:
+            return [(node, 0, 0, 0, 0)]
+        place = self.places.get(cell)
+        if place is None:
+            return []
+        edge, k = place
+        start, end, sides = self.edges[edge]
+        return [(start, k, edge, 0, k), (end, len(sides) - k, edge + 1, 0, len(sides) - k)]
+
+    def route(self, start: int, goal: int) -> Optional[tuple]:
+        # Кратчайший путь между клетками таблицы: (длина, срез до первого узла, первый узел, последний узел,
+        # срез от последнего узла). Если обе клетки в одном коридоре, путь может не заходить в узлы.
+        best = None
+        start_place, goal_place = self.places.get(start), self.places.get(goal)
+        if start_place and goal_place and start_place[0] == goal_place[0]:
+            edge, k, goal_k = start_place[0], start_place[1], goal_place[1]
+            length = len(self.edges[edge][2])
+            best = ((goal_k - k, (edge, k, goal_k), None, None, (0, 0, 0)) if goal_k >= k else
+                    (k - goal_k, (edge + 1, length - k, length - goal_k), None, None, (0, 0, 0)))
+        count = len(self.nodes)
+        for node, length, *head in self.exits(start):
+            for last, last_length, *tail in self.entries(goal):
+                distance = self.distances[node * count + last]
+                if distance != NO_DISTANCE and (best is None or length + distance + last_length < best[0]):
+                    best = (length + distance + last_length, head, node, last, tail)
+        return best
+
+    def walk(self, head, node: Optional[int], last: Optional[int], tail) -> Iterator[Tuple[int, int]]:
+        edges, count = self.edges, len(self.nodes)
+        yield from edges[head[0]][2][head[1]:head[2]]
+        while node != last:
+            _, node, sides = edges[self.first[node * count + last]]
+            yield from sides
+        yield from edges[tail[0]][2][tail[1]:tail[2]]
+
+    def plan(self, start, goal) -> Optional[Iterator[Tuple[int, int]]]:
+        '''Направления от клетки start до клетки goal, которые отдаются по мере движения: поиск делается
+        один раз, дальше на каждом узле следующий коридор берётся из таблицы. None, если пути нет или
+        start уже в goal. Как и RoutingTable.path, start может быть в двери дома или в конце туннеля.'''
+        table = self.table
+        goal_i = table.index.get((goal.x, goal.y))
+        if goal_i is None:
+            return None
+        x, y = table.wrap(start.x, start.y)
+        start_i = table.index.get((x, y))
+        if start_i is not None:
+            best, prefix = self.route(start_i, goal_i), ()
+        else:
+            # Первый шаг — на соседнюю клетку поля, от которой путь короче.
+            best = prefix = None
+            for side in directions:
+                i = table.index.get((x + side[0], y + side[1]))
+                route = self.route(i, goal_i) if i is not None else None
+                if route and (best is None or route[0] < best[0]):
+                    best, prefix = route, (side,)
+        if best is None or not prefix and not best[0]:
+            return None
+        return chain(prefix, self.walk(*best[1:])) if prefix else self.walk(*best[1:])
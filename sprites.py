@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import pygame
+
+from build_functions import load_image
+from global_values import cell_size
+
+
+SpriteKey = Tuple[str, Optional[str], Optional[str], Optional[int]]
+
+# Атлас собирает python tools/cropper.py --atlas: все спрайты в одном файле уже в размере экрана.
+atlas_image, atlas_index = 'data/atlas.png', 'data/atlas.json'
+
+sides = ('left', 'right', 'up', 'down')
+fruit_names = ('cherry', 'strawberry', 'peach', 'apple', 'melon', 'spaceship', 'bell', 'key')
+
+
+def sprite_source(key: SpriteKey) -> Tuple[str, Optional[int], Optional[Tuple[int, int]]]:
+    '''Возвращает (путь к файлу, color_key, размер) для ключа (персонаж, настроение, направление, кадр).'''
+    character, mood, direction, frame = key
+
+    if character in ('blinky', 'pinky', 'inky', 'clyde'):
+        angry = 'angry_' if mood == 'angry' else ''
+        return 'data/ghosts/{}/{}{}{}.png'.format(character, angry, direction, frame), None, None
+    if character == 'killing':
+        if mood == 'died':
+            return 'data/ghosts/killing/died-{}.png'.format(direction), None, None
+        return 'data/ghosts/killing/{}{}.png'.format(mood, frame), None, None
+    if character == 'pacman':
+        if mood == 'full':
+            return 'data/pacman/full.png', None, None
+        if mood == 'die':
+            return 'data/pacman/die{}.png'.format(frame), None, None
+        return 'data/pacman/{}{}.png'.format(direction, frame), -1, None
+    if character == 'fruits':
+        return 'data/fruits/{}.png'.format(mood), None, None
+    if character == 'food':
+        return 'data/other/{}_food.png'.format(mood), -1, (cell_size, cell_size)
+    if character == 'other':
+        if mood in ('volume_on', 'volume_off'):
+            return 'data/other/{}.png'.format(mood), None, (48, 48)
+        if mood == 'logo':
+            return 'data/other/logo{}.png'.format(frame), None, (128, 128)
+        if mood == 'maze':
+            return 'data/original maze.png', None, (28 * cell_size, 31 * cell_size)
+        if mood == 'namco':
+            return 'data/Namco logo and colors.png', None, (106, 17)
+        return 'data/other/{}.png'.format(mood), None, None
+    raise KeyError(key)
+
+
+def all_keys():
+    for ghost in ('blinky', 'pinky', 'inky', 'clyde'):
+        for side in sides:
+            for frame in (1, 2):
+                yield ghost, 'normal', side, frame
+                if ghost == 'blinky':
+                    yield ghost, 'angry', side, frame
+    for side in sides:
+        yield 'killing', 'died', side, None
+    for mood in ('disarmed', 'end-disarmed'):
+        for frame in (1, 2):
+            yield 'killing', mood, None, frame
+
+    yield 'pacman', 'full', None, None
+    for side in sides:
+        for frame in (1, 2):
+            yield 'pacman', None, side, frame
+    for frame in range(1, 12):
+        yield 'pacman', 'die', None, frame
+
+    for fruit in fruit_names:
+        yield 'fruits', fruit, None, None
+    for food in ('s', 'b'):
+        yield 'food', food, None, None
+    for mood in ('volume_on', 'volume_off', 'life'):
+        yield 'other', mood, None, None
+    for frame in (1, 2, 3):
+        yield 'other', 'logo', None, frame
+    yield 'other', 'maze', None, None
+    yield 'other', 'namco', None, None
+
+
+class SpriteRegistry:
+    '''Все спрайты игры: декодируются, масштабируются и конвертируются один раз.
+    Ключ — (персонаж, настроение, направление, кадр), лишние части ключа равны None.'''
+    def __init__(self):
+        self.sprites: Dict[SpriteKey, pygame.Surface] = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.loaded = False  # Все спрайты из all_keys() уже загружены
+        self.atlas_checked = False
+
+    def preload(self, background=False):
+        # Окно должно быть уже открыто: convert() и convert_alpha() берут формат экрана.
+        if background:
+            self.thread = threading.Thread(target=self.load_all, daemon=True)
+            self.thread.start()
+        else:
+            self.load_all()
+
+    def load_atlas(self) -> bool:
+        # Атлас читается одним файлом, а каждый спрайт вырезается из него отдельной поверхностью:
+        # подповерхности атласа рисуются медленнее, потому что SDL не ускоряет их через RLE.
+        # Если атласа нет или какой-то исходный файл новее него, спрайты грузятся по одному из своих файлов.
+        if not (os.path.exists(atlas_image) and os.path.exists(atlas_index)):
+            return False
+        with open(atlas_index) as file:
+            index = json.load(file)
+        built = os.path.getmtime(atlas_image)
+        if any(not os.path.exists(name) or os.path.getmtime(name) > built for name in index['sources']):
+            return False
+
+        atlas = pygame.image.load(atlas_image)
+        for entry in index['sprites']:
+            image = atlas.subsurface(entry['rect'])
+            if 'color_key' in entry:
+                # Как в load_image: спрайт с прозрачным цветом без альфа-канала рисуется быстрее.
+                image = image.convert()
+                image.set_colorkey(entry['color_key'])
+            else:
+                image = image.convert_alpha()
+            self.sprites[tuple(entry['key'])] = image
+        return True
+
+    def load_all(self):
+        for key in all_keys():
+            self.get(*key)
+        self.loaded = True
+
+    def get(self, character: str, mood: Optional[str] = None,
+            direction: Optional[str] = None, frame: Optional[int] = None) -> pygame.Surface:
+        key = (character, mood, direction, frame)
+        image = self.sprites.get(key)
+        if image is None:
+            with self.lock:
+                if not self.atlas_checked:
+                    self.atlas_checked = True
+                    self.load_atlas()
+                image = self.sprites.get(key)
+                if image is None:
+                    # Спрайт, который не был загружен заранее или ещё не успел загрузиться в фоне, загружается сразу.
+                    name, color_key, size = sprite_source(key)
+                    image = load_image(name, color_key, size)
+                    self.sprites[key] = image
+        return image
+
+
+sprites = SpriteRegistry()
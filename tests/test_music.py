@@ -0,0 +1,27 @@
+import pygame
+import pygame.mixer
+
+import game
+from audio import MUSIC, music, sound_bank
+from engine import TotalPoints
+
+
+def test_eat_ghost_is_not_cut_by_background_music(monkeypatch):
+    # Тик, в котором съеден призрак: остальные призраки ещё бегут, но мелодия hiding не должна
+    # перебить eat_ghost на канале музыки в том же кадре.
+    game.init_display()
+    pygame.mixer.init()
+    monkeypatch.setattr(game, 'totalpoints', TotalPoints(high_score='0'), raising=False)
+    monkeypatch.setattr(game, 'play_sound', False, raising=False)
+    monkeypatch.setattr(game, 'state', None)
+    intro = game.IntroScene(1)
+    intro.enter()
+    game.playing.enter()
+    for ghost in game.state.ghosts:
+        ghost.run = True
+    monkeypatch.setattr(game.state, 'step', lambda direction: [('eat_ghost', None)])
+
+    game.playing.frame(1 / 60)
+    assert game.playing.freeze > 0
+    assert music.track is None
+    assert sound_bank.channel(MUSIC).get_sound() == sound_bank.get('eat_ghost')
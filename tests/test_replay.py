@@ -0,0 +1,43 @@
+from engine import GameState, TotalPoints, simulate
+from maps import POINT
+from replay import Recording, replay
+
+
+def caught_on_last_pellet() -> GameState:
+    # Пакман стоит на последней точке, Блинки — на Пакмане, и следующий тик проверяет столкновения.
+    state = GameState(1, TotalPoints(high_score='0'), seed=0)
+    row, column = state.pacman.path
+    state.maze.food[:] = bytes(len(state.maze.food))
+    state.maze.food[row * state.maze.stride + column] = POINT
+    state.food_left = 1
+    state.blinky.x, state.blinky.y = state.pacman.x, state.pacman.y
+    state.global_frame = 5
+    return state
+
+
+def test_clear_wins_over_death_in_the_same_tick():
+    names = [name for name, _ in caught_on_last_pellet().step()]
+    assert 'clear' in names
+    assert 'death' not in names
+
+
+def test_simulate_goes_to_next_level_without_losing_a_life():
+    state = caught_on_last_pellet()
+    lifes = state.totalpoints.lifes
+    simulate(state, lambda state: None, 1)
+    assert (state.level, state.totalpoints.lifes) == (2, lifes)
+
+
+def test_replay_repeats_the_recorded_game(tmp_path):
+    recording = Recording(12345)
+    state = recording.new_game(TotalPoints(high_score='0'))
+    directions = [(-1, 0), (0, -1), (1, 0), (0, 1)]
+
+    def player(state):
+        direction = directions[state.ticks // 90 % 4] if state.ticks % 90 == 0 else None
+        recording.record(state.ticks, direction)
+        return direction
+
+    simulate(state, player, 1500)
+    recording.save(str(tmp_path / 'game.rec'), state.ticks)
+    assert replay(Recording.load(str(tmp_path / 'game.rec'))).snapshot() == state.snapshot()
@@ -0,0 +1,49 @@
+import pytest
+
+from build_functions import find_path
+from mapfile import graph, nodes_matrix, routes
+from routing import DistanceField
+
+# Клетки, с которых призрак начинает путь: концы туннеля, в том числе за краем экрана (x = 28 и отрицательный x,
+# который nodes_matrix отсчитывает с другого края), и дверь дома призраков.
+starts = [(28, 14), (-1, 14), (-2, 14), (0, 14), (27, 14), (13, 11), (14, 11), (13, 12), (14, 12)]
+goals = [(1, 1), (26, 1), (26, 29), (1, 29), (13, 23), (21, 14), (6, 14)]
+
+
+def cell(x, y):
+    return nodes_matrix[y][x]
+
+
+@pytest.mark.parametrize('start', starts)
+@pytest.mark.parametrize('goal', goals)
+def test_routes_from_tunnel_and_door(start, goal):
+    expected = find_path(cell(*start), cell(*goal))
+    assert expected is not None
+    path = routes.path(cell(*start), cell(*goal))
+    assert path is not None and len(path) == len(expected)
+    assert routes.distance(cell(*start), cell(*goal)) == len(expected)
+    assert routes.next_step(cell(*start), cell(*goal)) == path[0]
+
+    x, y = cell(*start).x, cell(*start).y
+    for s_x, s_y in path:
+        x, y = x + s_x, y + s_y
+        assert cell(x, y).type == 'field'
+    assert (x, y) == goal
+
+
+@pytest.mark.parametrize('start', starts)
+@pytest.mark.parametrize('goal', goals)
+def test_plan_from_tunnel_and_door(start, goal):
+    plan = graph.plan(cell(*start), cell(*goal))
+    assert plan is not None
+    assert len(list(plan)) == len(find_path(cell(*start), cell(*goal)))
+
+
+@pytest.mark.parametrize('position', starts)
+def test_distance_field_outside_the_table(position):
+    field = DistanceField(routes)
+    field.update(1, 1)
+    expected = find_path(cell(*position), cell(1, 1))
+    assert field.distance(*position) == len(expected)
+    assert field.toward(*position) is not None
+    assert len(field.path(*position)) == len(expected)
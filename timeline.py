@@ -0,0 +1,48 @@
+from typing import Callable, Iterable, Optional
+
+
+class Step:
+    '''Шаг кат-сцены: длительность в секундах, действие в начале шага (звук) и отрисовка,
+    которая вызывается каждый кадр, пока идёт шаг, со временем от начала шага.'''
+    def __init__(self, duration: float, draw: Optional[Callable[[float], None]] = None,
+                 start: Optional[Callable[[], None]] = None):
+        self.duration = duration
+        self.draw = draw
+        self.start = start
+
+
+class Timeline:
+    '''Кат-сцена как последовательность шагов вместо pygame.time.wait.
+    Главный цикл каждый кадр сдвигает её на прошедшее время и рисует текущий шаг, поэтому окно
+    продолжает обрабатывать события и перерисовываться, пока идёт заставка.'''
+    def __init__(self, steps: Iterable[Step]):
+        self.steps = list(steps)
+        self.index = -1  # До первого кадра ни один шаг не начат
+        self.time = 0.0  # Время от начала текущего шага
+
+    @property
+    def finished(self) -> bool:
+        return self.index >= len(self.steps)
+
+    def begin(self, index: int):
+        self.index = index
+        if not self.finished and self.steps[index].start:
+            self.steps[index].start()
+
+    def advance(self, elapsed: float) -> bool:
+        # Возвращает True, когда все шаги кончились. За один долгий кадр можно пройти несколько шагов.
+        if self.index < 0:
+            self.begin(0)
+        else:
+            self.time += elapsed
+        while not self.finished and self.time >= self.steps[self.index].duration:
+            self.time -= self.steps[self.index].duration
+            self.begin(self.index + 1)
+        return self.finished
+
+    def draw(self):
+        if not self.finished and self.steps[self.index].draw:
+            self.steps[self.index].draw(self.time)
+
+    def skip(self):
+        self.index = len(self.steps)
@@ -1,71 +1,249 @@
-from PIL import Image
+import argparse
+import json
 import os
+import shutil
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 try:
     import progressbar
 except Exception:
     pass
 
 
-if __name__ == '__main__':
-    os.system("mode con cols=110 lines=30")
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pack(sizes, width, padding=1):
+    '''Раскладывает прямоугольники по полкам: сначала самые высокие, слева направо, пока полка не заполнится.
+    Возвращает координаты в порядке sizes и высоту атласа.'''
+    positions = [None] * len(sizes)
+    x = y = shelf = 0
+    for i in sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0])):
+        w, h = sizes[i]
+        if x and x + w > width:
+            x, y, shelf = 0, y + shelf + padding, 0
+        positions[i] = (x, y)
+        x += w + padding
+        shelf = max(shelf, h)
+    return positions, y + shelf
+
+
+def build_atlas(width=1024):
+    '''Собирает все спрайты игры в data/atlas.png и пишет их прямоугольники в data/atlas.json.
+    Спрайты загружаются так же, как в игре (load_image), то есть уже в размере экрана. У спрайтов с color_key
+    в индексе записан прозрачный цвет: в игре они снова получают его, потому что такой спрайт рисуется
+    быстрее, чем спрайт с альфа-каналом.'''
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    sys.path.insert(0, root)
+    os.chdir(root)
+    import pygame
+    from build_functions import load_image
+    from sprites import all_keys, sprite_source, atlas_image, atlas_index
+
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))  # Для convert() и convert_alpha() внутри load_image
+
+    keys, images, color_keys, sources = list(all_keys()), [], [], set()
+    for key in keys:
+        name, color_key, size = sprite_source(key)
+        image = load_image(name, color_key, size)
+        sprite = pygame.Surface(image.get_size(), pygame.SRCALPHA, 32)
+        color_keys.append(image.get_colorkey())
+        if color_keys[-1] is not None:
+            sprite.fill((0, 0, 0, 255))
+            image.set_colorkey(None)  # В атлас попадают все пиксели, и прозрачного цвета тоже
+        # Точная копия вместе с альфой: на пустом месте атласа BLEND_RGBA_MAX просто переносит пиксели.
+        sprite.blit(image, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        images.append(sprite)
+        sources.add(name)
+
+    positions, height = pack([image.get_size() for image in images], width)
+    atlas = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+    atlas.fill((0, 0, 0, 0))
+    index = {'size': [width, height], 'sources': sorted(sources), 'sprites': []}
+    for key, image, color_key, (x, y) in zip(keys, images, color_keys, positions):
+        atlas.blit(image, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+        entry = {'key': list(key), 'rect': [x, y, image.get_width(), image.get_height()]}
+        if color_key is not None:
+            entry['color_key'] = list(color_key[:3])
+        index['sprites'].append(entry)
+
+    pygame.image.save(atlas, atlas_image)
+    with open(atlas_index, 'w', encoding='utf-8') as file:
+        json.dump(index, file, ensure_ascii=False, indent=1)
+    print('Атлас {}x{}: {} спрайтов из {} файлов -> {}, {}'.format(
+        width, height, len(keys), len(sources), atlas_image, atlas_index))
+
+
+sheet = None  # Лист, открытый в процессе-работнике один раз на все его задания
+
+
+def open_sheet(name):
+    global sheet
+    from PIL import Image
+    sheet = Image.open(name)
+    sheet.load()
+
+
+def grid(size, tile, gap):
+    '''Клетки листа построчно по столбцам: (столбец, строка, прямоугольник на листе).'''
+    return [(column, row, (x, y, x + tile[0], y + tile[1]))
+            for column, x in enumerate(range(0, size[0], tile[0] + gap))
+            for row, y in enumerate(range(0, size[1], tile[1] + gap))]
+
+
+def is_empty(tile):
+    # Пустая клетка: все пиксели полностью прозрачны, в том числе прозрачным цветом палитры.
+    if tile.mode not in ('RGBA', 'LA', 'PA') and 'transparency' not in tile.info:
+        return False
+    return tile.convert('RGBA').getchannel('A').getextrema()[1] == 0
+
+
+def crop_cells(cells, out, stem, ext):
+    # Задание процесса: вырезать и сохранить свою долю клеток. Дольше всего тут кодирование файлов.
+    saved = []
+    for column, row, box in cells:
+        tile = sheet.crop(box)
+        if is_empty(tile):
+            continue
+        name = os.path.join(out, '{}-{}-{}{}'.format(stem, column, row, ext))
+        tile.save(name)
+        saved.append(name)
+    return saved
+
+
+def cut_sheet(name, tile, gap, out, workers=None, progress=None):
+    '''Режет лист на клетки размера tile с отступом gap и сохраняет непустые в папку out.
+    Клетки делятся на задания для пула процессов. Возвращает число клеток и список сохранённых файлов.'''
+    from PIL import Image
+    with Image.open(name) as image:
+        cells = grid(image.size, tile, gap)
+    os.makedirs(out, exist_ok=True)
+    stem, ext = os.path.splitext(os.path.basename(name))
+
+    workers = workers or os.cpu_count()
+    chunk = max(1, -(-len(cells) // (workers * 4)))
+    saved = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=open_sheet, initargs=(name,)) as executor:
+        futures = {executor.submit(crop_cells, cells[i:i + chunk], out, stem, ext): min(chunk, len(cells) - i)
+                   for i in range(0, len(cells), chunk)}
+        done = 0
+        for future in as_completed(futures):
+            saved.extend(future.result())
+            done += futures[future]
+            if progress:
+                progress(done, len(cells))
+    return len(cells), sorted(saved)
+
+
+def pack_sheet(name, tile, gap, out, width=1024):
+    '''Вместо отдельных файлов собирает непустые клетки листа в один атлас out/<лист>.png
+    и пишет рядом out/<лист>.json: имя, столбец и строка клетки, её место на листе и в атласе.'''
+    from PIL import Image
+    open_sheet(name)
+    cells = [cell for cell in grid(sheet.size, tile, gap) if not is_empty(sheet.crop(cell[2]))]
+    width = max(tile[0], min(width, len(cells) * (tile[0] + 1)))
+    positions, height = pack([tile] * len(cells), width)
+
+    stem = os.path.splitext(os.path.basename(name))[0]
+    atlas = Image.new('RGBA', (width, max(height, 1)), (0, 0, 0, 0))
+    index = {'sheet': name, 'tile': list(tile), 'gap': gap, 'size': [width, height], 'tiles': []}
+    for (column, row, box), (x, y) in zip(cells, positions):
+        atlas.paste(sheet.crop(box).convert('RGBA'), (x, y))
+        index['tiles'].append({'name': '{}-{}-{}'.format(stem, column, row), 'column': column, 'row': row,
+                               'source': list(box), 'rect': [x, y, tile[0], tile[1]]})
+
+    os.makedirs(out, exist_ok=True)
+    atlas_name, index_name = os.path.join(out, stem + '.png'), os.path.join(out, stem + '.json')
+    atlas.save(atlas_name)
+    with open(index_name, 'w', encoding='utf-8') as file:
+        json.dump(index, file, ensure_ascii=False, indent=1)
+    return len(cells), atlas_name, index_name
+
+
+def tile_size(text):
+    # 16 или 16x24
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height or width)
+
+
+def crop_interactive():
     print(' CROPPER '.center(110, '-'))
     print(
 '''
 Cropper — разрезатель изображения на части, равные по ширине и высоте, с одинаковым отступом между ними.
 Убедитесь, что вокруг изображения нет никаких артефактов, а отступ между частями меньше самих частей.
 Все разрезанные части будут в папке result в том же формате, что и исходное изображение.
+Полностью прозрачные части пропускаются.
 '''
     )
     print('-' * 110)
 
     fname = input('Введите имя разрезаемого файла: ')
-    try:
-        im = Image.open(fname)
-    except Exception:
+    if not os.path.isfile(fname):
         print('Файла не существует.')
         sys.exit()
-    size = im.size
-    crop_x, crop_y = tuple(map(int, input('Задайте размер частей через пробел: ').split()))
+    tile = tuple(map(int, input('Задайте размер частей через пробел: ').split()))
     shift = int(input('Задайте отступ между частями: '))
 
-    amount = len(range(0, size[0], crop_x + shift)) * len(range(0, size[1], crop_y + shift))
-    if 'progressbar' in dir():
-        bar = progressbar.ProgressBar(maxval=amount, widgets=[
+    if os.path.isdir('result'):
+        if input('\nПапка result уже существует. Удалить текущую result? [y/n] ').strip().lower() in ('y', 'д'):
+            shutil.rmtree('result')
+    print()
+
+    bar = None
+    if 'progressbar' in globals():
+        bar = progressbar.ProgressBar(maxval=100, widgets=[
             'Прогресс: ',
             progressbar.Bar(left='[', marker='=', right='] '),
-            progressbar.SimpleProgress(' из ') 
+            progressbar.Percentage()
         ])
-    else:
-        bar = None
+        bar.start()
 
-    deleted = True
-    if os.path.isdir('result'):
-        print('\nПапка result уже существует. Удалить текущую result?')
-        deleted = not bool(os.system('rmdir result /S'))
-    print()
-    if deleted:
-        os.mkdir('result')
+    def progress(count, amount):
+        if bar:
+            bar.update(100 * count // amount)
+        else:
+            print('Нарезано картинок {} из {}'.format(count, amount), end='\r')
 
-    count = 0
-    if bar:
-        bar.start()
-    for x in range(0, size[0], crop_x + shift):
-        for y in range(0, size[1], crop_y + shift):
-            count += 1
-
-            temp_im = im.crop((x, y, x + crop_x, y + crop_y))
-            temp_im.save('result/{}-{}-{}.{}'.format(fname.split('.')
-                                                     [0], x // crop_x, y // crop_y, fname.split('.')[1]))
-
-            if bar:
-                bar.update(count)
-            else:
-                print('Нарезано картинок {} из {}'.format(count, amount), end='\r')
-                
+    amount, saved = cut_sheet(fname, tile, shift, 'result', progress=progress)
     if bar:
         bar.finish()
-    else:
-        print('Нарезано картинок {0} из {0}\n\nЗадача завершена!'.format(amount))
+    print('Нарезано картинок {} из {}, пустых пропущено {}\n\nЗадача завершена!'.format(
+        len(saved), amount, amount - len(saved)))
     print('-' * 110)
     input('Нажмите любую клавишу...')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cropper: нарезка изображения на части и сборка атласа спрайтов')
+    parser.add_argument('sheet', nargs='?', help='разрезаемый лист; без него cropper спрашивает всё сам')
+    parser.add_argument('--tile', type=tile_size, help='размер частей: 16 или 16x24')
+    parser.add_argument('--gap', type=int, default=0, help='отступ между частями')
+    parser.add_argument('-o', '--out', default='result', help='папка для частей или атласа листа')
+    parser.add_argument('--clean', action='store_true', help='сначала удалить папку out')
+    parser.add_argument('--pack', action='store_true',
+                        help='вместо отдельных файлов записать один атлас листа и JSON-индекс к нему')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='число процессов')
+    parser.add_argument('--atlas', action='store_true',
+                        help='собрать все спрайты игры в data/atlas.png с индексом data/atlas.json')
+    parser.add_argument('--atlas-width', type=int, default=1024)
+    args = parser.parse_args()
+    if args.atlas:
+        build_atlas(args.atlas_width)
+    elif args.sheet:
+        if not args.tile:
+            parser.error('для листа нужен --tile')
+        if args.clean and os.path.isdir(args.out):
+            shutil.rmtree(args.out)
+        started = time.perf_counter()
+        if args.pack:
+            amount, atlas_name, index_name = pack_sheet(args.sheet, args.tile, args.gap, args.out, args.atlas_width)
+            print('{} частей -> {}, {}'.format(amount, atlas_name, index_name), end='')
+        else:
+            amount, saved = cut_sheet(args.sheet, args.tile, args.gap, args.out, args.workers)
+            print('{} частей из {} -> {}'.format(len(saved), amount, args.out), end='')
+        print(' за {:.2f} с'.format(time.perf_counter() - started))
+    else:
+        crop_interactive()